@@ -1,8 +1,8 @@
 import os
-import requests
 from pathlib import Path
 import time
 import psutil  # Import psutil for process management
+from http_policy import get_with_retries
 
 GITHUB_API_URL = "https://api.github.com"
 REPO_OWNER = "sed-"
@@ -56,7 +56,7 @@ def terminate_process_from_pid():
 # Helper to fetch files from GitHub
 def fetch_remote_files():
     url = f"{GITHUB_API_URL}/repos/{REPO_OWNER}/{REPO_NAME}/commits"
-    response = requests.get(url)
+    response = get_with_retries(url)
     if response.status_code == 404:
         print("Loader-Senpai wasn't found")
         return []
@@ -69,7 +69,7 @@ def fetch_remote_files():
 
     latest_commit = commits[0]
     tree_url = latest_commit['commit']['tree']['url'] + "?recursive=1"
-    tree_response = requests.get(tree_url)
+    tree_response = get_with_retries(tree_url)
     tree_response.raise_for_status()
 
     file_list = tree_response.json().get('tree', [])
@@ -78,7 +78,7 @@ def fetch_remote_files():
 # Download and return the content of a remote file
 def download_file_content(remote_file_path):
     raw_url = f"https://raw.githubusercontent.com/{REPO_OWNER}/{REPO_NAME}/main/{remote_file_path}"
-    response = requests.get(raw_url)
+    response = get_with_retries(raw_url)
     if response.status_code == 404:
         print("Loader-Senpai wasn't found")
         return None
@@ -0,0 +1,14 @@
+import datetime
+
+
+def fuzzy_date(date):
+    """AniList FuzzyDate dict or datetime.date as a sortable YYYYMMDD int, 0 when the year is unknown.
+
+    Missing months and days count as 0, so "2024" sorts before any day in 2024.
+    """
+    if isinstance(date, datetime.date):
+        return date.year * 10000 + date.month * 100 + date.day
+    date = date or {}
+    if not date.get('year'):
+        return 0
+    return date['year'] * 10000 + (date.get('month') or 0) * 100 + (date.get('day') or 0)
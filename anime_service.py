@@ -1,10 +1,83 @@
 import requests
 import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from requests.adapters import HTTPAdapter
+from rate_limiter import RateLimiter
+from http_policy import DEFAULT_RETRY_POLICY, LatencyTracker, is_mutation, timeout_for
+from response_cache import CachedResponse, ResponseCache
+from single_flight import SingleFlight
+from query_batcher import QueryBatcher
+
+API_URL = "https://graphql.anilist.co"
+
+# How many times a request is re-sent after AniList answers 429
+MAX_RATE_LIMIT_RETRIES = 3
+
+# Threads for hedged reads, each hedged read holds two (primary and hedge)
+HEDGE_WORKERS = 8
+
+class AniListError(requests.HTTPError):
+    """AniList answered a streamed/paged request with an error status."""
+
+    def __init__(self, message, response):
+        super().__init__(message, response=response)
+        self.status_code = response.status_code
+
+    def error_messages(self):
+        try:
+            return [error.get('message') for error in self.response.json().get('errors', [])]
+        except ValueError:
+            return []
+
 
 class AnimeService:
-    def __init__(self, api_url, headers):
+    """Process-wide AniList GraphQL client.
+
+    The session context holds one instance that every command shares, so all
+    requests go through a single keep-alive session instead of paying a new
+    TCP+TLS handshake per call.
+    """
+
+    def __init__(self, api_url=API_URL, headers=None, cache=None):
         self.api_url = api_url
-        self.headers = headers
+        self.session = requests.Session()
+        # A small pool is plenty, we only ever talk to one host
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=8)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.set_headers(headers if headers is not None else self.get_headers())
+        self.rate_limiter = RateLimiter()
+        self.timeout = timeout_for(api_url)
+        self.retry_policy = DEFAULT_RETRY_POLICY
+        self.latency = LatencyTracker()
+
+        # Read queries may send a duplicate request once they run past the p95
+        # latency; whichever answers first wins.
+        self.hedge_reads = True
+        self.hedged_requests = 0
+        self._hedge_lock = threading.Lock()
+        self._hedge_slots_used = 0
+        self._hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix='anilist-hedge')
+
+        # Read responses are kept on disk between runs (see response_cache.py)
+        self.cache = cache
+
+        # Identical reads already in flight are shared instead of sent again
+        self.single_flight = SingleFlight()
+
+        # Small lookups are packed into aliased multi-field requests
+        self.batcher = QueryBatcher(self)
+
+    @staticmethod
+    def open_cache():
+        try:
+            return ResponseCache()
+        except sqlite3.Error as e:
+            print(f"Response cache unavailable, continuing without it: {e}")
+            return None
 
     @staticmethod
     def get_api_token():
@@ -16,6 +89,232 @@ class AnimeService:
             print("Token file not found.")
             return None
 
+    @staticmethod
+    def get_headers():
+        """Build the headers every AniList request is sent with."""
+        return AnimeService.build_headers(AnimeService.get_api_token())
+
+    @staticmethod
+    def build_headers(token):
+        headers = {
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate',
+        }
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        return headers
+
+    def set_headers(self, headers):
+        self.headers = headers
+        self.session.headers.pop('Authorization', None)
+        self.session.headers.update(headers)
+
+    def post(self, query, variables=None, use_cache=True, cache_kind=None):
+        """Send a GraphQL query or mutation and return the raw response.
+
+        Read queries are answered from the response cache when a fresh copy
+        exists, otherwise retried with exponential backoff on network errors
+        and 5xx responses, and may be hedged. Mutations are only re-sent when
+        the connection was never made, so a write is never applied twice, and
+        they drop the cached lists and stats they may have changed.
+        cache_kind overrides the TTL class the cache would pick from the query.
+        """
+        payload = {"query": query}
+        if variables is not None:
+            payload["variables"] = variables
+
+        if is_mutation(query):
+            response = self.retry_policy.call_mutation(lambda: self._send(payload))
+            if self.cache and response.status_code == 200:
+                self.cache.invalidate()
+            return response
+
+        use_cache = use_cache and self.cache is not None
+        if use_cache:
+            content = self.cache.get(query, variables)
+            if content is not None:
+                return CachedResponse(content)
+
+        def fetch():
+            response = self.retry_policy.call(lambda: self._send_hedged(payload))
+            if use_cache and response.status_code == 200:
+                self.cache.put(query, variables, response.content, kind=cache_kind)
+            return response
+
+        return self.single_flight.do(ResponseCache.make_key(query, variables), fetch)
+
+    def _send(self, payload, token_acquired=False):
+        """One logical request: paced by the rate limiter, with 429s waited out.
+
+        On a 429 the request is held for exactly as long as Retry-After says
+        and then sent again. A 429 means AniList rejected the request, so
+        re-sending is safe even for mutations.
+        """
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            if not token_acquired:
+                self.rate_limiter.acquire()
+            token_acquired = False
+
+            started = time.monotonic()
+            response = self.session.post(self.api_url, json=payload, timeout=self.timeout)
+            self.rate_limiter.update_from_headers(response.headers)
+            if response.status_code == 200:
+                self.latency.record(time.monotonic() - started)
+            if response.status_code != 429 or attempt == MAX_RATE_LIMIT_RETRIES:
+                return response
+
+            retry_after = self.rate_limiter.int_header(response.headers, 'Retry-After')
+            if retry_after is None:
+                retry_after = 60
+            print(f"AniList rate limit reached, waiting {retry_after}s...")
+            self.rate_limiter.retry_after(retry_after)
+        return response
+
+    def _reserve_hedge_slots(self):
+        """Claim a thread for the primary and one for the hedge, False when the pool is busy."""
+        with self._hedge_lock:
+            if self._hedge_slots_used + 2 > HEDGE_WORKERS:
+                return False
+            self._hedge_slots_used += 2
+            return True
+
+    def _release_hedge_slot(self, future=None):
+        with self._hedge_lock:
+            self._hedge_slots_used -= 1
+
+    def _send_hedged(self, payload):
+        """Send a read, firing one duplicate if it runs past the p95 latency.
+
+        The rate limit token is taken on the caller's thread and both requests
+        have a thread reserved before anything is submitted, so the hedge delay
+        only ever counts time the request spent on the wire. When the pool is
+        busy (a wide fan-out) the read is sent plainly, without a hedge.
+        """
+        delay = self.latency.hedge_delay() if self.hedge_reads else None
+        if delay is None or not self._reserve_hedge_slots():
+            return self._send(payload)
+
+        try:
+            self.rate_limiter.acquire()
+            primary = self._hedge_executor.submit(self._send, payload, True)
+        except BaseException:
+            self._release_hedge_slot()
+            self._release_hedge_slot()
+            raise
+        primary.add_done_callback(self._release_hedge_slot)
+        try:
+            response = primary.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+        except BaseException:
+            self._release_hedge_slot()
+            raise
+        else:
+            self._release_hedge_slot()
+            return response
+
+        # Never wait on the rate limiter for a hedge, it is only worth it if free
+        if not self.rate_limiter.try_acquire():
+            self._release_hedge_slot()
+            return primary.result()
+
+        with self._hedge_lock:
+            self.hedged_requests += 1
+        hedge = self._hedge_executor.submit(self._send, payload, True)
+        hedge.add_done_callback(self._release_hedge_slot)
+        error = None
+        for future in as_completed([primary, hedge]):
+            try:
+                return future.result()
+            except requests.RequestException as e:
+                error = e
+        raise error
+
+    def get_stats(self):
+        """Counters for telling rate-limit stalls apart from slow network."""
+        stats = self.rate_limiter.stats()
+        with self._hedge_lock:
+            stats['hedged_requests'] = self.hedged_requests
+        stats['coalesced_requests'] = self.single_flight.coalesced
+        stats['batches_sent'] = self.batcher.batches_sent
+        stats['batched_fields'] = self.batcher.fields_sent
+        stats['p95_latency'] = self.latency.percentile(95)
+        if self.cache:
+            stats['cache_hits'] = self.cache.hits
+            stats['cache_misses'] = self.cache.misses
+        return stats
+
+    def iter_list_entries(self, username, selection, status=None, per_chunk=500, use_cache=True):
+        """Yield a user's anime list entries chunk by chunk as they arrive.
+
+        MediaListCollection is requested with chunk/perChunk, so only one chunk
+        is held in memory at a time however long the list is. Custom lists are
+        skipped, their entries already appear in the status lists.
+        """
+        query = """
+        query ($userName: String, $status: MediaListStatus, $chunk: Int, $perChunk: Int) {
+            MediaListCollection(userName: $userName, type: ANIME, status: $status, chunk: $chunk, perChunk: $perChunk) {
+                hasNextChunk
+                lists {
+                    isCustomList
+                    entries {
+                        %s
+                    }
+                }
+            }
+        }
+        """ % selection
+        chunk = 1
+        while True:
+            variables = {"userName": username, "status": status, "chunk": chunk, "perChunk": per_chunk}
+            response = self.post(query, variables, use_cache=use_cache)
+            if response.status_code != 200:
+                raise AniListError(f"Failed to fetch the list of {username}: {response.status_code}", response)
+            collection = response.json()['data']['MediaListCollection']
+            for media_list in collection['lists']:
+                if media_list.get('isCustomList'):
+                    continue
+                yield from media_list['entries']
+            if not collection.get('hasNextChunk'):
+                return
+            chunk += 1
+
+    def iter_list_changes(self, username, since, selection, per_page=50):
+        """Yield a user's list entries updated after `since`, newest first.
+
+        Pages through mediaList sorted by UPDATED_TIME_DESC and stops at the
+        first entry that is not newer than the cursor, so only the changes are
+        downloaded. Always goes to the network, cached pages would hide changes.
+        """
+        query = """
+        query ($userName: String, $page: Int, $perPage: Int) {
+            Page(page: $page, perPage: $perPage) {
+                pageInfo {
+                    hasNextPage
+                }
+                mediaList(userName: $userName, type: ANIME, sort: UPDATED_TIME_DESC) {
+                    updatedAt
+                    %s
+                }
+            }
+        }
+        """ % selection
+        page = 1
+        while True:
+            variables = {"userName": username, "page": page, "perPage": per_page}
+            response = self.post(query, variables, use_cache=False)
+            if response.status_code != 200:
+                raise AniListError(f"Failed to fetch list changes for {username}: {response.status_code}", response)
+            data = response.json()['data']['Page']
+            for entry in data['mediaList']:
+                if entry['updatedAt'] <= since:
+                    return
+                yield entry
+            if not data['pageInfo']['hasNextPage']:
+                return
+            page += 1
+
     def fetch_user_stats(self, username):
         """Fetch user statistics using GraphQL query."""
         query = """
@@ -30,7 +329,7 @@ class AnimeService:
             meanScore
             episodesWatched
             minutesWatched
-            genres { 
+            genres {
                 genre
                 count
                 meanScore
@@ -42,8 +341,8 @@ class AnimeService:
     }
     """
         variables = {"userName": username}
-        response = requests.post(self.api_url, json={"query": query, "variables": variables}, headers=self.headers)
-        
+        response = self.post(query, variables)
+
         if response.status_code == 200:
             return response.json()
         else:
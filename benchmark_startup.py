@@ -0,0 +1,260 @@
+"""Measure what starting Loader-senpai costs.
+
+Usage: python benchmark_startup.py [--runs=N]
+
+Times cold and warm time-to-prompt of 1.Loader-Senpai.py, the import cost
+of every command module (python -X importtime), colorama.init and the
+startup file checks. Everything is compared against startup_budgets.json
+and appended to startup_results.json, so a regression shows up as a delta
+against the previous run.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+MAIN_SCRIPT = '1.Loader-Senpai.py'
+BUDGETS_FILE = 'startup_budgets.json'
+RESULTS_FILE = 'startup_results.json'
+
+# Printed by the main loop, seeing it means the prompt is up
+PROMPT_MARKER = b'Whats up?'
+USERNAME_MARKER = b"user name?"
+TOKEN_MARKER = b'do you want me to open the read me'
+
+PROMPT_TIMEOUT = 60
+DEFAULT_RUNS = 3
+
+# Either of these would stop the warm runs from ever finding cached bytecode
+BYTECODE_ENV_VARS = ('PYTHONDONTWRITEBYTECODE', 'PYTHONPYCACHEPREFIX')
+
+# Timed in a fresh interpreter so nothing is already imported
+PHASE_SNIPPETS = {
+    'colorama.init': (
+        "from colorama import init\n"
+        "start = time.perf_counter()\n"
+        "init(autoreset=True)\n"
+    ),
+    'list store check': (
+        "from session_context import SessionContext\n"
+        "start = time.perf_counter()\n"
+        "SessionContext('https://graphql.anilist.co').list_store.count(['COMPLETED'])\n"
+    ),
+    'token file check': (
+        "from session_context import SessionContext\n"
+        "start = time.perf_counter()\n"
+        "SessionContext('https://graphql.anilist.co').token\n"
+    ),
+    'command factory': (
+        "from command_factory import CommandFactory\n"
+        "start = time.perf_counter()\n"
+        "CommandFactory('https://graphql.anilist.co')\n"
+    ),
+}
+
+
+def load_json(path, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+
+def local_version():
+    try:
+        with open('Version.txt', 'r') as file:
+            for line in file:
+                if line.startswith("Version:"):
+                    return line.split(":")[1].strip()
+    except FileNotFoundError:
+        pass
+    return None
+
+
+def child_env():
+    env = dict(os.environ)
+    for name in BYTECODE_ENV_VARS:
+        env.pop(name, None)
+    return env
+
+
+def has_bytecode(pycache_prefix):
+    return any(name.endswith('.pyc') for _, _, files in os.walk(pycache_prefix) for name in files)
+
+
+def time_to_prompt(pycache_prefix):
+    """Seconds from process start until the main prompt is printed, None if it never shows up.
+
+    A fresh pycache_prefix forces every module to be compiled again (cold),
+    reusing one measures a warm start.
+    """
+    command = [sys.executable, '-X', f'pycache_prefix={pycache_prefix}', MAIN_SCRIPT]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=APP_DIR, env=child_env(), stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    timer = threading.Timer(PROMPT_TIMEOUT, process.kill)
+    timer.start()
+    output = b''
+    elapsed = None
+    try:
+        while True:
+            chunk = os.read(process.stdout.fileno(), 4096)
+            if not chunk:
+                break
+            output += chunk
+            if PROMPT_MARKER in output:
+                elapsed = time.perf_counter() - start
+                break
+            if USERNAME_MARKER in output:
+                # Never answer this one, whatever is typed ends up in username.txt
+                print("username.txt is empty, run the app once before benchmarking the prompt.")
+                break
+            if TOKEN_MARKER in output:
+                output = output.replace(TOKEN_MARKER, b'')
+                process.stdin.write(b'n\n')
+                process.stdin.flush()
+    finally:
+        # Killed rather than sent "quit", a pending prompt would take it as an answer
+        timer.cancel()
+        process.kill()
+        process.wait()
+    return elapsed
+
+
+def module_import_times(modules):
+    """Cumulative import time of each module in milliseconds, from python -X importtime."""
+    results = {}
+    for module in modules:
+        completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                   cwd=APP_DIR, env=child_env(), capture_output=True, text=True)
+        if completed.returncode != 0:
+            results[module] = None
+            continue
+        for line in completed.stderr.splitlines():
+            # "import time:       self [us] |  cumulative | imported package"
+            parts = line.split('|')
+            if len(parts) == 3 and parts[2].strip() == module:
+                results[module] = int(parts[1]) / 1000
+        results.setdefault(module, None)
+    return results
+
+
+def phase_times():
+    results = {}
+    for name, snippet in PHASE_SNIPPETS.items():
+        code = ("import os, sys, time\n" + snippet +
+                "sys.stdout.write('\\nPHASE %f' % ((time.perf_counter() - start) * 1000))\n")
+        completed = subprocess.run([sys.executable, '-c', code], cwd=APP_DIR, env=child_env(),
+                                   capture_output=True, text=True)
+        marker = completed.stdout.rsplit('PHASE ', 1)
+        results[name] = float(marker[1]) if completed.returncode == 0 and len(marker) == 2 else None
+    return results
+
+
+def command_modules():
+    """Every command module the factory can load, read from its manifest."""
+    sys.path.insert(0, APP_DIR)
+    from command_factory import CommandFactory
+    return [entry['module'] for entry in CommandFactory.build_manifest(CommandFactory.read_features()).values()]
+
+
+def over_budget(results, budgets):
+    problems = []
+    prompt_budgets = budgets.get('time_to_prompt_ms', {})
+    for kind, value in results['time_to_prompt_ms'].items():
+        budget = prompt_budgets.get(kind)
+        if value is not None and budget is not None and value > budget:
+            problems.append(f"{kind} time to prompt {value:.0f} ms > {budget} ms")
+
+    module_budgets = budgets.get('modules_ms', {})
+    for module, value in results['modules_ms'].items():
+        budget = module_budgets.get(module, module_budgets.get('default'))
+        if value is not None and budget is not None and value > budget:
+            problems.append(f"import {module} {value:.1f} ms > {budget} ms")
+
+    phase_budgets = budgets.get('phases_ms', {})
+    for phase, value in results['phases_ms'].items():
+        budget = phase_budgets.get(phase, phase_budgets.get('default'))
+        if value is not None and budget is not None and value > budget:
+            problems.append(f"{phase} {value:.1f} ms > {budget} ms")
+    return problems
+
+
+def print_results(results, previous):
+    def delta(section, key):
+        if not previous:
+            return ""
+        before = previous.get(section, {}).get(key)
+        now = results[section][key]
+        if before is None or now is None:
+            return ""
+        return f" ({now - before:+.1f} ms vs {previous.get('version')})"
+
+    print("Time to prompt:")
+    for kind, value in results['time_to_prompt_ms'].items():
+        shown = f"{value:.0f} ms" if value is not None else "n/a"
+        print(f"  {kind:<6} {shown}{delta('time_to_prompt_ms', kind)}")
+    print("Command module imports (cumulative):")
+    for module, value in sorted(results['modules_ms'].items(), key=lambda item: -(item[1] or 0)):
+        shown = f"{value:.1f} ms" if value is not None else "failed"
+        print(f"  {module:<32} {shown}{delta('modules_ms', module)}")
+    print("Startup phases:")
+    for phase, value in results['phases_ms'].items():
+        shown = f"{value:.2f} ms" if value is not None else "failed"
+        print(f"  {phase:<32} {shown}{delta('phases_ms', phase)}")
+
+
+def main():
+    os.chdir(APP_DIR)
+    runs = DEFAULT_RUNS
+    for option in sys.argv[1:]:
+        if option.startswith('--runs='):
+            runs = max(int(option.split('=', 1)[1]), 1)
+
+    cold = []
+    warm = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as pycache_prefix:
+            cold.append(time_to_prompt(pycache_prefix))
+            if not has_bytecode(pycache_prefix):
+                # A "warm" run would compile everything again and only measure another cold start
+                print("The cold run wrote no bytecode, warm numbers would be meaningless. Nothing was saved.")
+                return 1
+            warm.append(time_to_prompt(pycache_prefix))
+
+    def best(samples):
+        samples = [sample * 1000 for sample in samples if sample is not None]
+        return min(samples) if samples else None
+
+    results = {
+        'version': local_version(),
+        'timestamp': time.time(),
+        'python': sys.version.split()[0],
+        'time_to_prompt_ms': {'cold': best(cold), 'warm': best(warm)},
+        'modules_ms': module_import_times(command_modules()),
+        'phases_ms': phase_times(),
+    }
+
+    history = load_json(RESULTS_FILE, [])
+    print_results(results, history[-1] if history else None)
+    history.append(results)
+    with open(RESULTS_FILE, 'w', encoding='utf-8') as file:
+        json.dump(history, file, indent=1)
+
+    problems = over_budget(results, load_json(BUDGETS_FILE, {}))
+    if problems:
+        print("Over budget:")
+        for problem in problems:
+            print(f"  {problem}")
+        return 1
+    print("Everything is within budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
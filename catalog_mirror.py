@@ -0,0 +1,311 @@
+import json
+import os
+import threading
+import time
+import numpy as np
+from anilist_dates import fuzzy_date
+from list_store import normalize_title
+
+MIRROR_DIR = 'catalog_mirror'
+MIRROR_META = 'meta.json'
+
+# Records of shows that are still airing are trusted for this long after a refresh
+MIRROR_FRESH = 24 * 3600
+
+# Shows in these states do not change any more, their records never go stale
+FINAL_STATUSES = ('FINISHED', 'CANCELLED')
+
+MIRROR_PER_PAGE = 50
+
+# (name, dtype, missing value) of the fixed width columns
+NUMERIC_COLUMNS = [
+    ('id', np.int32, 0),
+    ('format', np.uint8, 0),
+    ('status', np.uint8, 0),
+    ('episodes', np.int16, -1),
+    ('duration', np.int16, -1),
+    ('start_year', np.int16, 0),
+    ('end_date', np.int32, 0),
+    ('average_score', np.int8, -1),
+    ('popularity', np.int32, 0),
+    ('genres', np.uint32, 0),
+    ('updated_at', np.int64, 0),
+]
+
+# Columns that hold an index into the string table, -1 for none
+STRING_COLUMNS = ['title_romaji', 'title_english', 'title_native', 'synonyms']
+
+MIRROR_MEDIA_SELECTION = """
+    id
+    title {
+      romaji
+      english
+      native
+    }
+    synonyms
+    format
+    status
+    episodes
+    duration
+    startDate {
+      year
+    }
+    endDate {
+      year
+      month
+      day
+    }
+    averageScore
+    popularity
+    genres
+    updatedAt
+"""
+
+
+class CatalogMirror:
+    """Local copy of AniList's anime catalog as memory-mapped NumPy columns.
+
+    Every column is a .npy file opened with mmap_mode='r', so loading the
+    mirror costs nothing until a column is touched. Titles live in one UTF-8
+    string table addressed through an offsets column. Files are written
+    under a new generation number and meta.json is swapped in last, which
+    makes a refresh atomic for readers.
+    """
+
+    def __init__(self, path=MIRROR_DIR):
+        self.path = path
+        self.lock = threading.Lock()
+        self.meta = None
+        self.meta_mtime = None
+        self.columns = None
+        self.title_rows = None
+
+    def _file(self, name, generation):
+        return os.path.join(self.path, f"{name}.{generation}.npy")
+
+    def load(self):
+        """Open the current generation. Returns False when there is no mirror yet.
+
+        Cheap to call before every lookup: meta.json is only re-read when its mtime moved.
+        """
+        meta_path = os.path.join(self.path, MIRROR_META)
+        with self.lock:
+            try:
+                mtime = os.stat(meta_path).st_mtime_ns
+            except OSError:
+                return False
+            if mtime == self.meta_mtime:
+                return self.meta is not None
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as file:
+                    meta = json.load(file)
+            except (OSError, json.JSONDecodeError):
+                return False
+            self.meta_mtime = mtime
+            if self.meta and self.meta['generation'] == meta['generation']:
+                self.meta = meta
+                return True
+            names = [name for name, _, _ in NUMERIC_COLUMNS] + STRING_COLUMNS + ['strings', 'string_offsets']
+            try:
+                self.columns = {name: np.load(self._file(name, meta['generation']), mmap_mode='r') for name in names}
+            except (OSError, ValueError) as e:
+                print(f"Catalog mirror is unreadable, run mirror --full: {e}")
+                self.columns = None
+                return False
+            self.meta = meta
+            self.title_rows = None
+            return True
+
+    @property
+    def available(self):
+        return self.load() and self.meta['count'] > 0
+
+    @property
+    def fresh(self):
+        return self.available and time.time() - self.meta['refreshed_at'] < MIRROR_FRESH
+
+    def string(self, index):
+        if index < 0:
+            return None
+        offsets = self.columns['string_offsets']
+        return bytes(self.columns['strings'][offsets[index]:offsets[index + 1]]).decode('utf-8')
+
+    def row_of(self, media_id):
+        """Row of a media ID or None, ids are kept sorted so this is a binary search."""
+        if not self.available:
+            return None
+        ids = self.columns['id']
+        row = int(np.searchsorted(ids, media_id))
+        if row < len(ids) and ids[row] == media_id:
+            return row
+        return None
+
+    def usable(self, row):
+        """Finished shows are always trusted, anything else only while the mirror is fresh."""
+        status = self.meta['statuses'][self.columns['status'][row]]
+        return status in FINAL_STATUSES or self.fresh
+
+    def find_title(self, title):
+        """Row whose romaji, English, native title or synonym equals title after normalization.
+
+        None when no row or more than one row has that title (remakes,
+        a movie named like its series), a guessed ID would stick.
+        """
+        if not self.available:
+            return None
+        if self.title_rows is None:
+            title_rows = {}
+            for column in STRING_COLUMNS:
+                for row, index in enumerate(self.columns[column]):
+                    if index < 0:
+                        continue
+                    for name in self.string(int(index)).split('\n'):
+                        key = normalize_title(name)
+                        # Ambiguous titles are kept as None
+                        title_rows[key] = row if title_rows.get(key, row) == row else None
+            self.title_rows = title_rows
+        return self.title_rows.get(normalize_title(title))
+
+    def finished_between(self, first_date, last_date):
+        """Rows of anime that finished with first_date <= endDate <= last_date (fuzzy date ints)."""
+        if not self.available:
+            return []
+        end_date = self.columns['end_date']
+        finished = self.meta['statuses'].index('FINISHED') if 'FINISHED' in self.meta['statuses'] else -1
+        mask = (end_date >= first_date) & (end_date <= last_date) & (self.columns['status'] == finished)
+        return [int(row) for row in np.flatnonzero(mask)]
+
+    def media(self, row):
+        """A record shaped like an AniList Media object."""
+        columns = self.columns
+        meta = self.meta
+        media_id = int(columns['id'][row])
+        end_date = int(columns['end_date'][row])
+        genre_bits = int(columns['genres'][row])
+        synonyms = self.string(int(columns['synonyms'][row]))
+        return {
+            'id': media_id,
+            'title': {
+                'romaji': self.string(int(columns['title_romaji'][row])),
+                'english': self.string(int(columns['title_english'][row])),
+                'native': self.string(int(columns['title_native'][row])),
+            },
+            'synonyms': synonyms.split('\n') if synonyms else [],
+            'format': meta['formats'][columns['format'][row]],
+            'status': meta['statuses'][columns['status'][row]],
+            'episodes': int(columns['episodes'][row]) if columns['episodes'][row] >= 0 else None,
+            'duration': int(columns['duration'][row]) if columns['duration'][row] >= 0 else None,
+            'startDate': {'year': int(columns['start_year'][row]) or None},
+            'endDate': {'year': end_date // 10000 or None, 'month': end_date // 100 % 100 or None,
+                        'day': end_date % 100 or None},
+            'averageScore': int(columns['average_score'][row]) if columns['average_score'][row] >= 0 else None,
+            'popularity': int(columns['popularity'][row]),
+            'genres': [genre for bit, genre in enumerate(meta['genres']) if genre_bits & (1 << bit)],
+            'siteUrl': f"https://anilist.co/anime/{media_id}",
+            'updatedAt': int(columns['updated_at'][row]),
+        }
+
+    def all_media(self):
+        if not self.available:
+            return []
+        return [self.media(row) for row in range(self.meta['count'])]
+
+    def write(self, media_items, max_updated_at):
+        """Write a new generation from AniList media dicts and swap it in."""
+        records = sorted({media['id']: media for media in media_items}.values(), key=lambda media: media['id'])
+        previous = self.meta or {}
+        formats = list(previous.get('formats') or [None])
+        statuses = list(previous.get('statuses') or [None])
+        genres = list(previous.get('genres') or [])
+
+        def vocabulary_index(vocabulary, value):
+            if value not in vocabulary:
+                vocabulary.append(value)
+            return vocabulary.index(value)
+
+        numeric = {name: np.full(len(records), missing, dtype=dtype) for name, dtype, missing in NUMERIC_COLUMNS}
+        string_index = {name: np.full(len(records), -1, dtype=np.int32) for name in STRING_COLUMNS}
+        chunks = []
+        offsets = [0]
+
+        def add_string(value):
+            if not value:
+                return -1
+            encoded = value.encode('utf-8')
+            chunks.append(encoded)
+            offsets.append(offsets[-1] + len(encoded))
+            return len(chunks) - 1
+
+        for row, media in enumerate(records):
+            title = media.get('title') or {}
+            numeric['id'][row] = media['id']
+            numeric['format'][row] = vocabulary_index(formats, media.get('format'))
+            numeric['status'][row] = vocabulary_index(statuses, media.get('status'))
+            if media.get('episodes') is not None:
+                numeric['episodes'][row] = min(media['episodes'], 32767)
+            if media.get('duration') is not None:
+                numeric['duration'][row] = min(media['duration'], 32767)
+            numeric['start_year'][row] = (media.get('startDate') or {}).get('year') or 0
+            numeric['end_date'][row] = fuzzy_date(media.get('endDate'))
+            if media.get('averageScore') is not None:
+                numeric['average_score'][row] = media['averageScore']
+            numeric['popularity'][row] = media.get('popularity') or 0
+            bits = 0
+            for genre in media.get('genres') or []:
+                index = vocabulary_index(genres, genre)
+                if index < 32:
+                    bits |= 1 << index
+            numeric['genres'][row] = bits
+            numeric['updated_at'][row] = media.get('updatedAt') or 0
+            string_index['title_romaji'][row] = add_string(title.get('romaji'))
+            string_index['title_english'][row] = add_string(title.get('english'))
+            string_index['title_native'][row] = add_string(title.get('native'))
+            string_index['synonyms'][row] = add_string('\n'.join(media.get('synonyms') or []))
+
+        os.makedirs(self.path, exist_ok=True)
+        generation = previous.get('generation', 0) + 1
+        arrays = dict(numeric, **string_index)
+        arrays['strings'] = np.frombuffer(b''.join(chunks), dtype=np.uint8)
+        arrays['string_offsets'] = np.array(offsets, dtype=np.int64)
+        for name, array in arrays.items():
+            np.save(self._file(name, generation), array)
+
+        meta = {
+            'generation': generation,
+            'count': len(records),
+            'refreshed_at': time.time(),
+            'max_updated_at': max_updated_at,
+            'formats': formats,
+            'statuses': statuses,
+            'genres': genres,
+        }
+        meta_path = os.path.join(self.path, MIRROR_META)
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(meta, file)
+        os.replace(meta_path + '.tmp', meta_path)
+
+        with self.lock:
+            self.meta = None
+            self.meta_mtime = None
+            self.columns = None
+            self.title_rows = None
+        self.load()
+        self._remove_old_generations(generation)
+
+    def mark_refreshed(self):
+        """Nothing changed upstream, only the refresh time moves."""
+        meta = dict(self.meta, refreshed_at=time.time())
+        meta_path = os.path.join(self.path, MIRROR_META)
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(meta, file)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def _remove_old_generations(self, generation):
+        suffix = f".{generation}.npy"
+        for name in os.listdir(self.path):
+            if name.endswith('.npy') and not name.endswith(suffix):
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    # Still mapped somewhere (Windows), the next refresh gets it
+                    pass
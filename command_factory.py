@@ -1,13 +1,26 @@
+import ast
 import json
 import importlib
 import os
 import sys
+from session_context import SessionContext
+
+MANIFEST_FILE = 'command_manifest.json'
+MANIFEST_VERSION = 2
+
+# Class attributes the factory needs before the command module is imported
+COMMAND_FLAGS = ('requires_api', 'requires_parameter', 'requires_username', 'reusable')
 
 class CommandFactory:
-    def __init__(self, api_url):
+    def __init__(self, api_url, context=None):
         self.api_url = api_url
+        self.context = context or SessionContext(api_url)
         self.commands = self.load_commands()
-        self.loaded_classes = self.load_command_classes()
+        # Command modules are only imported the first time they run
+        self.loaded_classes = {}
+        # Instances of reusable commands run without a parameter, built once per session
+        self.reused_commands = {}
+        self.manifest = self.load_manifest()
 
         # Get the absolute path to the 'commands' directory
         commands_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'commands'))
@@ -24,32 +37,98 @@ class CommandFactory:
             print("commands.json file not found.")
             return {}
 
-    def load_command_classes(self):
-        """Load the command classes dynamically from features.txt."""
-        classes = {}
+    @staticmethod
+    def read_features():
         try:
             with open('features.txt', 'r') as file:
-                for line in file:
-                    class_name = line.strip()  # Get the class name from the line
-                    if class_name:
-                        # Add 'commands.' prefix with the correct CamelCase module name
-                        module_name = f"commands.{class_name}"
-
-                        try:
-                            # Import module with CamelCase
-                            module = importlib.import_module(module_name)
-
-                            # Access the class from the module
-                            command_class = getattr(module, class_name)
-
-                            # Store the class for later use
-                            classes[class_name] = command_class
-                        except (ModuleNotFoundError, AttributeError) as e:
-                            print(f"Error loading {class_name} from module {module_name}: {e}")
+                return [line.strip() for line in file if line.strip()]
         except FileNotFoundError:
             print("features.txt file not found.")
+            return []
+
+    @staticmethod
+    def source_signature(class_names):
+        """mtime and size of every file the manifest is derived from."""
+        paths = ['commands.json', 'features.txt'] + [os.path.join('commands', f"{name}.py") for name in class_names]
+        signature = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                signature[path] = [stat.st_mtime_ns, stat.st_size]
+            except OSError:
+                signature[path] = None
+        return signature
+
+    def load_manifest(self):
+        """Class name -> module and requires_* flags, rebuilt only when a source file changed."""
+        class_names = self.read_features()
+        signature = self.source_signature(class_names)
+        try:
+            with open(MANIFEST_FILE, 'r', encoding='utf-8') as file:
+                manifest = json.load(file)
+            if manifest.get('version') == MANIFEST_VERSION and manifest.get('signature') == signature:
+                return manifest['classes']
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+        classes = self.build_manifest(class_names)
+        try:
+            with open(MANIFEST_FILE, 'w', encoding='utf-8') as file:
+                json.dump({'version': MANIFEST_VERSION, 'signature': signature, 'classes': classes}, file, indent=1)
+        except OSError as e:
+            print(f"Could not write {MANIFEST_FILE}: {e}")
         return classes
 
+    @staticmethod
+    def build_manifest(class_names):
+        """Read the requires_* flags straight from the command sources with ast, nothing is imported."""
+        classes = {}
+        for class_name in class_names:
+            # Add 'commands.' prefix with the correct CamelCase module name
+            module_name = f"commands.{class_name}"
+            path = os.path.join('commands', f"{class_name}.py")
+            try:
+                with open(path, 'r', encoding='utf-8') as file:
+                    tree = ast.parse(file.read(), filename=path)
+            except (OSError, SyntaxError) as e:
+                print(f"Error loading {class_name} from module {module_name}: {e}")
+                continue
+
+            class_node = next((node for node in tree.body
+                               if isinstance(node, ast.ClassDef) and node.name == class_name), None)
+            if class_node is None:
+                print(f"Error loading {class_name} from module {module_name}: class not found")
+                continue
+
+            entry = {'module': module_name}
+            entry.update({flag: False for flag in COMMAND_FLAGS})
+            for node in class_node.body:
+                if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant):
+                    for target in node.targets:
+                        if isinstance(target, ast.Name) and target.id in COMMAND_FLAGS:
+                            entry[target.id] = bool(node.value.value)
+            classes[class_name] = entry
+        return classes
+
+    def get_command_class(self, class_key):
+        """Import a command's module the first time it is used."""
+        command_class = self.loaded_classes.get(class_key)
+        if command_class is not None:
+            return command_class
+        entry = self.manifest.get(class_key)
+        if not entry:
+            return None
+        try:
+            # Import module with CamelCase
+            module = importlib.import_module(entry['module'])
+            # Access the class from the module
+            command_class = getattr(module, class_key)
+        except (ModuleNotFoundError, AttributeError) as e:
+            print(f"Error loading {class_key} from module {entry['module']}: {e}")
+            return None
+        self.loaded_classes[class_key] = command_class
+        return command_class
+
     def get_command(self, command_input):
         """Determine and return an instance of the command class based on input."""
         parts = command_input.split()
@@ -62,35 +141,42 @@ class CommandFactory:
 
         # Get the class name from the commands.json binding
         class_key = command_config['class']
-        command_class = self.loaded_classes.get(class_key)
+        entry = self.manifest.get(class_key)
 
-        if not command_class:
+        if not entry:
             print(f"Class {class_key} not found in loaded classes.")
             return None
 
-        # Check if command requires parameters
-        requires_parameter = getattr(command_class, 'requires_parameter', False)
-        requires_username = getattr(command_class, 'requires_username', False)
+        # Check if command requires parameters, without importing it yet
+        requires_parameter = entry['requires_parameter']
+        requires_username = entry['requires_username']
         parameter = " ".join(parts[1:]) if len(parts) > 1 else None
 
         if requires_parameter and not parameter:
             print(f"{command_key} command requires a parameter.")
             return None
 
-        if requires_username and not parameter:
-            # Use the command class's method to fetch the username
-            parameter = command_class.get_username_from_file()  
-            if not parameter:
-                print(f"{command_key} command requires a username.")
-                return None
+        command_class = self.get_command_class(class_key)
+        if not command_class:
+            return None
+
+        if requires_username and not parameter and not self.context.username:
+            print(f"{command_key} command requires a username.")
+            return None
+
+        reusable = entry['reusable'] and not parameter
+        if reusable and class_key in self.reused_commands:
+            return self.reused_commands[class_key]
 
         # Instantiate command class with or without parameters
-        if command_class.requires_api:
-            if requires_username:
-                return command_class(self.api_url, parameter)
-            return command_class(self.api_url, parameter) if parameter else command_class(self.api_url)
+        if entry['requires_api']:
+            # Commands that need a username fall back to the session's own
+            command = command_class(self.api_url, parameter, context=self.context)
         else:
-            return command_class(parameter) if parameter else command_class()
+            command = command_class(parameter) if parameter else command_class()
+        if reusable:
+            self.reused_commands[class_key] = command
+        return command
 
 if __name__ == "__main__":
     factory = CommandFactory("https://graphql.anilist.co")
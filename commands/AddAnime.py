@@ -1,36 +1,21 @@
-import requests
-import json
-import os
+from list_store import STATUS_LABELS
+from query_batcher import GraphQLEnum, build_field
 
 class AddAnime:
     requires_api = True  # Indicates this command needs the API URL
     requires_parameter = True  # Indicates this command requires a parameter
 
-    def __init__(self, api_url, anime_name):
+    def __init__(self, api_url, anime_name, *, context):
         if not anime_name:
             raise ValueError("Anime name is required for AddAnime command.")
         self.api_url = api_url
-        self.headers = self.get_headers()
+        self.context = context
+        self.anime_service = self.context.anime_service
         self.anime_name = anime_name
-
-    @staticmethod
-    def get_headers():
-        token = AddAnime.get_api_token()
-        return {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-        }
-
-    @staticmethod
-    def get_api_token():
-        """Static method to retrieve the API token from a file."""
-        try:
-            with open('token.txt', 'r') as file:
-                return file.read().strip()
-        except FileNotFoundError:
-            print("Token file not found.")
-            return None
+        self.anime_title = None
+        self.anime_title_english = None
+        self.anime_episodes = None
+        self.list_store = self.context.list_store
 
     def execute(self):
         """Method to execute the addition of anime to the watchlist."""
@@ -82,11 +67,11 @@ class AddAnime:
             'score': float(rating)
         }
 
-        response = requests.post(self.api_url, json={'query': mutation, 'variables': variables}, headers=self.headers)
+        response = self.anime_service.post(mutation, variables)
         if response.status_code == 200:
             print(f"Marked '{self.anime_name}' as completed with a rating of {rating}.")
-            self.remove_from_other_lists('watched_anime.txt')
-            self.save_to_watched_list(rating)
+            # AniList sets progress to the full episode count when an entry is completed
+            self.save_to_store(anime_id, 'COMPLETED', progress=self.anime_episodes, score=float(rating))
         else:
             print(f"Failed to mark '{self.anime_name}' as completed. HTTP Status: {response.status_code}")
             print(f"Response: {response.text}")
@@ -101,15 +86,15 @@ class AddAnime:
             print("Episode count must be a number.")
             return
 
-        # Mapping list_choice to API status and corresponding file
+        # Mapping list_choice to API status
         status_mapping = {
-            '2': ('CURRENT', 'currently_watching.txt'),  # Currently watching
-            '3': ('PAUSED', 'on_hold.txt'),   # On hold
-            '4': ('DROPPED', 'dropped.txt'),  # Dropped
-            '5': ('PLANNING', 'plan_to_watch.txt')  # Plan to watch
+            '2': 'CURRENT',  # Currently watching
+            '3': 'PAUSED',   # On hold
+            '4': 'DROPPED',  # Dropped
+            '5': 'PLANNING'  # Plan to watch
         }
 
-        status, filename = status_mapping.get(list_choice)
+        status = status_mapping.get(list_choice)
 
         if not status:
             print("Invalid choice. Please select a valid option.")
@@ -128,101 +113,54 @@ class AddAnime:
             'progress': episode_count
         }
 
-        response = requests.post(self.api_url, json={'query': mutation, 'variables': variables}, headers=self.headers)
+        response = self.anime_service.post(mutation, variables)
         if response.status_code == 200:
             print(f"Marked '{self.anime_name}' as {status.lower()} with {episode_count} episodes watched.")
-            # Remove from other lists before adding to the new list
-            self.remove_from_other_lists(filename)
-            self.save_to_list_file(filename, episode_count)
+            self.save_to_store(anime_id, status, progress=episode_count)
         else:
             print(f"Failed to update list for '{self.anime_name}'. HTTP Status: {response.status_code}")
             print(f"Response: {response.text}")
 
-    def save_to_watched_list(self, rating):
-        """Check for duplicates in 'watched_anime.txt' before writing."""
-        self.save_to_file('watched_anime.txt', f"{self.anime_name}: {rating}")
-
-    def save_to_list_file(self, filename, episode_count):
-        """Check for duplicates and save anime to the specified list file with episode count."""
-        self.save_to_file(filename, f"{self.anime_name}: {episode_count} episodes")
-
-    def save_to_file(self, filename, entry):
-        """General method to check for duplicates in a file before writing an entry."""
-        try:
-            with open(filename, 'r') as file:
-                entry_list = file.readlines()
-                # Normalize the entries: strip whitespace, convert to lowercase
-                entry_list = [line.strip().lower() for line in entry_list]
-        except FileNotFoundError:
-            entry_list = []
-
-        # Normalize the anime name (lowercase for comparison)
-        anime_entry_clean = f"{self.anime_name}".strip().lower()
-
-        # Check if anime exists in the list file (ignore episode count or rating during check)
-        if any(anime_entry_clean in entry for entry in entry_list):
-            print(f"'{self.anime_name}' already exists in {filename}.")
+    def save_to_store(self, anime_id, status, progress=None, score=None):
+        """Record the entry locally. The store is keyed by media ID, so a move between lists is one row update.
+
+        Progress or score left as None keeps whatever the store already had.
+        """
+        previous = self.list_store.get(anime_id)
+        if previous:
+            progress = previous['progress'] if progress is None else progress
+            score = previous['score'] if score is None else score
+        self.list_store.upsert({
+            'media_id': anime_id,
+            'status': status,
+            'progress': progress,
+            'score': score,
+            'title': self.anime_title or self.anime_name,
+            'title_english': self.anime_title_english,
+        })
+        label = STATUS_LABELS.get(status, status)
+        if previous and previous['status'] != status:
+            print(f"Moved '{self.anime_name}' from {STATUS_LABELS.get(previous['status'], previous['status'])} to {label}.")
         else:
-            try:
-                with open(filename, 'a') as file:
-                    file.write(f"{entry}\n")  # Ensure new line is added with \n
-                print(f"Added '{self.anime_name}' to {filename}.")
-            except IOError as e:
-                print(f"Failed to write to {filename}: {e}")
-
-    def remove_from_other_lists(self, current_list_file):
-        """Removes the anime from other list files if it exists."""
-        # List of all possible list files
-        list_files = ['currently_watching.txt', 'on_hold.txt', 'dropped.txt', 'plan_to_watch.txt']
-
-        # Check if the current_list_file is in the list before removing it
-        if current_list_file in list_files:
-            list_files.remove(current_list_file)
-
-        # Normalize the anime name for comparison
-        anime_entry_clean = f"{self.anime_name}".strip().lower()
-
-        for file_name in list_files:
-            if os.path.exists(file_name):
-                try:
-                    with open(file_name, 'r') as file:
-                        lines = file.readlines()
-
-                    # Filter out lines that contain the anime entry
-                    new_lines = [line for line in lines if anime_entry_clean not in line.strip().lower()]
-
-                    # If the file was modified (i.e., anime was found and removed), update it
-                    if len(new_lines) < len(lines):
-                        with open(file_name, 'w') as file:
-                            file.writelines(new_lines)
-                        print(f"Removed '{self.anime_name}' from {file_name}.")
-                except IOError as e:
-                    print(f"Failed to update {file_name}: {e}")
+            print(f"Saved '{self.anime_name}' to {label}.")
 
     def find_anime_id(self, anime_name):
         """Searches for the anime by name and returns its ID."""
-        query = '''
-        query ($name: String) {
-            Media (search: $name, type: ANIME) {
+        field = build_field('Media', {'search': anime_name, 'type': GraphQLEnum('ANIME')}, """
                 id
                 title {
                     romaji
                     english
                 }
-            }
-        }
-        '''
-        variables = {'name': anime_name}
-        response = requests.post(self.api_url, json={'query': query, 'variables': variables}, headers=self.headers)
-        if response.status_code == 200:
-            data = response.json()
-            if data['data']['Media']:
-                anime = data['data']['Media']
-                print(f"Found anime: {anime['title']['romaji']} (ID: {anime['id']})")
-                return anime['id']
-            else:
-                print("No anime found with that name.")
-                return None
+                episodes
+        """)
+        anime = self.anime_service.batcher.fetch(field)
+        if anime:
+            print(f"Found anime: {anime['title']['romaji']} (ID: {anime['id']})")
+            self.anime_title = anime['title']['romaji']
+            self.anime_title_english = anime['title'].get('english')
+            self.anime_episodes = anime.get('episodes')
+            return anime['id']
         else:
-            print(f"Failed to search for anime. HTTP Status: {response.status_code}")
+            print("No anime found with that name.")
             return None
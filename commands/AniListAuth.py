@@ -2,11 +2,13 @@ import os
 import requests
 import time
 import webbrowser
+from http_policy import timeout_for
 
 class AniListAuth:
-    requires_api = False
+    requires_api = True
 
-    def __init__(self):
+    def __init__(self, api_url, parameter=None, *, context):
+        self.context = context
         # Prompt the user to enter client ID and secret
         self.client_id = input("Please enter your client ID: ")
         self.client_secret = input("Please enter your client secret: ")
@@ -38,7 +40,7 @@ class AniListAuth:
 
         try:
             # Send POST request to get access token
-            response = requests.post(token_url, data=data)
+            response = requests.post(token_url, data=data, timeout=timeout_for(token_url))
             response.raise_for_status()  # Raise exception for HTTP errors
 
             # Extract access token from response
@@ -57,6 +59,9 @@ class AniListAuth:
         with open("token.txt", "w") as token_file:
             token_file.write(self.access_token)
 
+        # Make the session and its AniList client pick up the new token
+        self.context.set_token(self.access_token)
+
         # Clear the screen
         os.system('cls' if os.name == 'nt' else 'clear')
 
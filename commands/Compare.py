@@ -1,145 +1,92 @@
-import requests
-import json
-import unicodedata
-from rapidfuzz import process, fuzz  # Correct import for rapidfuzz
+from anime_service import AniListError
+from list_store import normalize_title
+from title_matcher import DEFAULT_SCORER, DEFAULT_THRESHOLD, SCORERS, TitleMatcher
 import os
 
 class Compare:
     requires_api = True
     requires_parameter = True
 
-    def __init__(self, api_url, username=None):
-        if not username:
-            raise ValueError("Username is required for Compare.")
+    def __init__(self, api_url, username=None, *, context):
+        # "-c name --threshold=85 --scorer=token_sort_ratio" tunes the fuzzy matching
+        options = (username or '').split()
+        self.threshold = DEFAULT_THRESHOLD
+        self.scorer = DEFAULT_SCORER
+        for option in options:
+            name, _, value = option.partition('=')
+            if name == '--threshold':
+                try:
+                    threshold = float(value)
+                except ValueError:
+                    threshold = None
+                if threshold is not None and 0 <= threshold <= 100:
+                    self.threshold = threshold
+                else:
+                    print(f"Invalid threshold '{value}' (0-100), using {DEFAULT_THRESHOLD}.")
+            elif name == '--scorer':
+                if value.lower() in SCORERS:
+                    self.scorer = value.lower()
+                else:
+                    print(f"Unknown scorer '{value}', using {DEFAULT_SCORER}. Options: {', '.join(SCORERS)}")
+            elif option.startswith('--'):
+                print(f"Unknown option '{option}' ignored.")
+        # execute() reports a missing username, raising here would end the REPL
+        username = ' '.join(option for option in options if not option.startswith('--'))
         self.api_url = api_url
         self.username = username
-        self.headers = self.get_headers()
-
-    @staticmethod
-    def get_headers():
-        token = Compare.get_api_token()
-        return {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-        }
-
-    @staticmethod
-    def get_api_token():
-        try:
-            with open('token.txt', 'r') as file:
-                return file.read().strip()
-        except FileNotFoundError:
-            print("Token file not found.")
-            return None
+        self.context = context
+        self.anime_service = self.context.anime_service
+        self.status_index = self.context.status_index
+        self.list_store = self.context.list_store
+        self.friend_lists = self.context.friend_lists
+        self.catalog_mirror = self.context.catalog_mirror
 
     def execute(self):
         if self.username:
-            user_data = self.fetch_user_completed_anime(self.username)
-            if user_data and 'data' in user_data and 'MediaListCollection' in user_data['data']:
-                self._display_stats(user_data['data']['MediaListCollection'])
-                self.compare_watched_list(user_data['data']['MediaListCollection'])
-            else:
-                print(f"No data available for {self.username}.")
-        else:
-            print("Username is required for this command.")
-
-    def fetch_user_completed_anime(self, username):
-        query = """
-        query ($userName: String, $status: MediaListStatus) {
-          MediaListCollection(userName: $userName, status: $status, type: ANIME) {
-            lists {
-              name
-              entries {
-                media {
-                  id
-                  title {
-                    romaji
-                  }
-                  genres
-                  averageScore
-                }
-              }
-            }
-          }
-        }
-        """
-        variables = {"userName": username, "status": "COMPLETED"}
-        response = requests.post(self.api_url, json={"query": query, "variables": variables}, headers=self.headers)
-        
-        if response.status_code == 200:
-            try:
-                return response.json()
-            except json.JSONDecodeError:
-                print("Failed to decode JSON from response.")
-                return None
-        elif response.status_code == 404:
             try:
-                error_details = response.json()
-                if error_details['errors'][0]['message'] == "Private User":
+                self.compare_watched_list(self.fetch_user_completed_anime(self.username))
+            except AniListError as e:
+                if e.status_code == 404 and "Private User" in e.error_messages():
                     print(f"User's profile is set to private.")
                 else:
-                    print(f"Failed to fetch user stats for {username}: {response.status_code}")
-                    print("Error details:", json.dumps(error_details, indent=4))
-            except json.JSONDecodeError:
-                print("Failed to decode JSON from response.")
-            return None
+                    print(f"Failed to fetch user stats for {self.username}: {e.status_code}")
+                    print(f"No data available for {self.username}.")
         else:
-            print(f"Failed to fetch user stats for {username}: {response.status_code}")
-            print("Response content:", response.content)
-            return None
-
-    def _display_stats(self, media_list_collection):
-        if not media_list_collection or 'lists' not in media_list_collection:
-            print("Media list collection is empty or malformed.")
-            return
-        
-        total_animes_watched = 0
-        for anime_list in media_list_collection['lists']:
-            if 'completed' in anime_list['name'].lower():
-                total_animes_watched += len(anime_list['entries'])
+            print("Username is required for this command.")
 
+    def fetch_user_completed_anime(self, username):
+        """The user's completed entries from the local snapshot, refreshed with only what changed."""
+        return self.friend_lists.completed(self.anime_service, username)
+
+    def _display_stats(self, total_animes_watched):
         print(f"Total Animes Watched: {total_animes_watched}")
 
-    def compare_watched_list(self, media_list_collection):
+    def compare_watched_list(self, completed_anime):
         # Ensure compare.txt exists
         if not os.path.exists('compare.txt'):
             open('compare.txt', 'w', encoding='utf-8').close()
 
-        if not media_list_collection or 'lists' not in media_list_collection:
-            print("Media list collection is empty or malformed.")
-            return
-
-        user1_watched_titles = self.read_user1_watched_list()
-        normalized_user1_watched = {self.normalize_string(title) for title in user1_watched_titles}
-
-        completed_anime = []
-        for anime_list in media_list_collection['lists']:
-            if 'completed' in anime_list['name'].lower():
-                for entry in anime_list['entries']:
-                    completed_anime.append({
-                        'title': entry['media']['title']['romaji'],
-                        'genres': entry['media'].get('genres', []),
-                        'averageScore': entry['media'].get('averageScore', 'N/A')
-                    })
-
-        fetched_anime_count = len(completed_anime)
+        my_completed_ids, unresolved_titles = self.read_user1_watched_list()
+        # The catalog mirror can name most ID-less entries without looking at the friend's list
+        mirror_resolved = self.resolve_from_mirror(unresolved_titles)
+        my_completed_ids |= {media_id for media_id, _ in mirror_resolved.values()}
+        unresolved_titles -= set(mirror_resolved)
+
+        # Entries are diffed by media ID, only the ones we have not seen are kept
+        fetched_anime_count = 0
+        unmatched = []
+        for anime in completed_anime:
+            fetched_anime_count += 1
+            if anime['id'] not in my_completed_ids:
+                unmatched.append(anime)
+
+        self._display_stats(fetched_anime_count)
         print(f"Fetched {fetched_anime_count} completed anime.")
 
-        # Use the optimized set operations and fuzzy matching in all cases
-        completed_anime_set = {self.normalize_string(anime['title']) for anime in completed_anime}
-
-        # Find differences using set difference
-        exact_difference_titles = [
-            anime for anime in completed_anime
-            if self.normalize_string(anime['title']) not in normalized_user1_watched
-        ]
-
-        # Fuzzy match for titles that didn't match exactly
-        difference_titles = [
-            anime for anime in exact_difference_titles
-            if not self.fuzzy_match(anime['title'], normalized_user1_watched)
-        ]
+        # Titles are only compared against my entries that have no media ID yet
+        difference_titles = unmatched
+        if unresolved_titles and unmatched:
+            difference_titles = self.match_unresolved(unmatched, unresolved_titles)
 
         if len(difference_titles) >= 21:
             user_input = input(f"{self.username} has {len(difference_titles)} animes you haven't seen. "
@@ -173,23 +120,64 @@ class Compare:
                 print(f"- {anime['title']}")
 
     def read_user1_watched_list(self):
-        try:
-            with open('watched_anime.txt', 'r', encoding='utf-8') as file:
-                return [line.strip() for line in file.readlines()]
-        except FileNotFoundError:
-            print("watched_anime.txt file not found.")
-            return []
+        """Media IDs of my completed list, plus the normalized titles of entries without an ID yet."""
+        media_ids = self.status_index.media_ids({'COMPLETED'})
+        unresolved_titles = self.status_index.unresolved_title_keys({'COMPLETED'})
+        if not media_ids and not unresolved_titles:
+            print("Your completed list is empty, run -ulist first.")
+        return media_ids, unresolved_titles
+
+    def resolve_from_mirror(self, unresolved_titles):
+        """Exact title lookups of my ID-less entries in the catalog mirror, saved to the list store."""
+        resolved = {}
+        for title_key in unresolved_titles:
+            row = self.catalog_mirror.find_title(title_key)
+            if row is not None:
+                anime = self.catalog_mirror.media(row)
+                resolved[title_key] = (anime['id'], anime['title']['romaji'])
+        if resolved:
+            self.list_store.resolve_media_ids(resolved)
+            print(f"Resolved media IDs for {len(resolved)} of your entries from the catalog mirror.")
+        return resolved
+
+    def match_unresolved(self, unmatched, unresolved_titles):
+        """Title match (exact, then fuzzy) against my ID-less entries and save the IDs found.
+
+        Returns the anime that still have no match. A local title claimed by
+        more than one of the friend's entries is left unresolved.
+        """
+        claims = {}
+        remaining = []
+        for anime in unmatched:
+            title_key = self.normalize_string(anime['title'])
+            if title_key in unresolved_titles:
+                claims.setdefault(title_key, []).append(anime)
+            else:
+                remaining.append(anime)
+
+        difference_titles = []
+        if remaining:
+            matches = self.fuzzy_match([anime['title'] for anime in remaining], unresolved_titles)
+            for anime, title_key in zip(remaining, matches):
+                if title_key is None:
+                    difference_titles.append(anime)
+                else:
+                    claims.setdefault(title_key, []).append(anime)
+
+        resolved = {title_key: (animes[0]['id'], animes[0]['title'])
+                    for title_key, animes in claims.items() if len(animes) == 1}
+        if resolved:
+            self.list_store.resolve_media_ids(resolved)
+            print(f"Resolved media IDs for {len(resolved)} of your entries.")
+        return difference_titles
 
     def normalize_string(self, title):
-        title = unicodedata.normalize('NFKC', title)
-        title = title.lower()
-        title = title.replace('×', 'x')
-        return ' '.join(title.split())
-
-    def fuzzy_match(self, title, normalized_titles):
-        # Use rapidfuzz for fast fuzzy matching
-        normalized_title = self.normalize_string(title)
-        matches = process.extract(normalized_title, normalized_titles, limit=1, scorer=fuzz.ratio)
-        if matches and matches[0][1] > 80:  # Match found with a ratio greater than 80
-            return True
-        return False
\ No newline at end of file
+        return normalize_title(title)
+
+    def fuzzy_match(self, titles, normalized_titles):
+        """Returns the matching normalized title for each title, None when nothing is close enough."""
+        matcher = TitleMatcher(normalized_titles, scorer=self.scorer, threshold=self.threshold)
+        matched = [choice for choice, _ in matcher.best_matches(titles)]
+        print(f"Fuzzy matched {len(titles)} titles against {len(normalized_titles)} "
+              f"({matcher.scorer_name} > {matcher.threshold:g}) in {matcher.last_duration:.2f}s")
+        return matched
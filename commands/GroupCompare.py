@@ -0,0 +1,138 @@
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from anime_service import AniListError
+import numpy as np
+import time
+
+# Lists are refreshed in parallel, the shared rate limiter keeps us under AniList's budget
+MAX_FETCH_WORKERS = 8
+
+# How many "the group has seen it, you haven't" titles to show per member
+MAX_SUGGESTIONS = 10
+
+class GroupCompare:
+    requires_api = True
+    requires_parameter = True
+
+    def __init__(self, api_url, usernames=None, *, context):
+        # "-gc alice bob carol" or "-gc alice, bob, carol"
+        names = (usernames or '').replace(',', ' ').split()
+        # Keep the order given, drop repeats
+        self.usernames = list(dict.fromkeys(names))
+        self.api_url = api_url
+        self.context = context
+        self.anime_service = self.context.anime_service
+        self.friend_lists = self.context.friend_lists
+
+    def execute(self):
+        if len(self.usernames) < 2:
+            print("At least two usernames are needed, e.g. -gc alice bob carol")
+            return
+        start = time.perf_counter()
+        lists = self.fetch_all(self.usernames)
+        if len(lists) < 2:
+            print("Need at least two readable lists to compare.")
+            return
+        print(f"Fetched {len(lists)} lists in {time.perf_counter() - start:.2f}s")
+
+        names = list(lists)
+        titles, seen, scores = self.build_matrices(lists)
+        jaccard = self.jaccard_matrix(seen)
+        score_diff = self.score_difference_matrix(scores)
+
+        self.print_matrix("Overlap (Jaccard %)", names, jaccard * 100, "{:.0f}")
+        self.print_matrix("Mean score difference (0-100, shared rated titles)", names, score_diff, "{:.1f}")
+        self.print_suggestions(names, titles, seen, scores)
+
+    def fetch_completed(self, username):
+        """Completed list of one user as {media_id: (title, score or None)}, from the local snapshot."""
+        return {anime['id']: (anime['title'], anime['score'])
+                for anime in self.friend_lists.completed(self.anime_service, username)}
+
+    def fetch_all(self, usernames):
+        lists = {}
+        with ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(usernames))) as executor:
+            futures = {username: executor.submit(self.fetch_completed, username) for username in usernames}
+            for username, future in futures.items():
+                try:
+                    lists[username] = future.result()
+                except AniListError as e:
+                    if e.status_code == 404 and "Private User" in e.error_messages():
+                        print(f"{username}'s profile is set to private, skipping.")
+                    else:
+                        print(f"Failed to fetch the list of {username}: {e.status_code}, skipping.")
+                except requests.RequestException as e:
+                    # One member timing out should not cost the rest of the group
+                    print(f"Failed to fetch the list of {username}: {e}, skipping.")
+        return lists
+
+    @staticmethod
+    def build_matrices(lists):
+        """Users x media: a seen mask and a score matrix (NaN where unrated or unseen)."""
+        titles = {}
+        for completed in lists.values():
+            for media_id, (title, _) in completed.items():
+                titles.setdefault(media_id, title)
+        media_ids = list(titles)
+        column = {media_id: idx for idx, media_id in enumerate(media_ids)}
+
+        seen = np.zeros((len(lists), len(media_ids)), dtype=bool)
+        scores = np.full((len(lists), len(media_ids)), np.nan, dtype=np.float32)
+        for row, completed in enumerate(lists.values()):
+            columns = [column[media_id] for media_id in completed]
+            seen[row, columns] = True
+            for media_id, (_, score) in completed.items():
+                if score:
+                    scores[row, column[media_id]] = score
+        return [titles[media_id] for media_id in media_ids], seen, scores
+
+    @staticmethod
+    def jaccard_matrix(seen):
+        as_int = seen.astype(np.int32)
+        intersection = as_int @ as_int.T
+        sizes = as_int.sum(axis=1)
+        union = sizes[:, None] + sizes[None, :] - intersection
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(union > 0, intersection / union, 0.0)
+
+    @staticmethod
+    def score_difference_matrix(scores):
+        """Mean absolute score difference over titles both users rated, NaN when there are none."""
+        rated = ~np.isnan(scores)
+        filled = np.nan_to_num(scores)
+        differences = np.full((len(scores), len(scores)), np.nan, dtype=np.float32)
+        for row in range(len(scores)):
+            both = rated[row] & rated
+            counts = both.sum(axis=1)
+            totals = (np.abs(filled[row] - filled) * both).sum(axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                differences[row] = np.where(counts > 0, totals / counts, np.nan)
+        return differences
+
+    @staticmethod
+    def print_matrix(label, names, matrix, value_format):
+        width = max(8, max(len(name) for name in names) + 1)
+        print(f"\n{label}")
+        print(" " * width + "".join(name[:width - 1].rjust(width) for name in names))
+        for name, row in zip(names, matrix):
+            cells = "".join(("-" if np.isnan(value) else value_format.format(value)).rjust(width) for value in row)
+            print(name[:width - 1].ljust(width) + cells)
+
+    @staticmethod
+    def print_suggestions(names, titles, seen, scores):
+        """For each member, titles most of the rest of the group finished but they have not."""
+        seen_count = seen.sum(axis=0)
+        rated = ~np.isnan(scores)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            group_mean = np.where(rated.sum(axis=0) > 0, np.nansum(scores, axis=0) / rated.sum(axis=0), 0.0)
+        others = len(names) - 1
+        for row, name in enumerate(names):
+            # Nobody's own entries count towards what "the others" have seen
+            candidates = np.flatnonzero(~seen[row] & (seen_count * 2 > others))
+            if candidates.size == 0:
+                continue
+            order = np.lexsort((-group_mean[candidates], -seen_count[candidates]))
+            print(f"\n{name} hasn't seen:")
+            for idx in candidates[order][:MAX_SUGGESTIONS]:
+                score_text = f", avg {group_mean[idx]:.0f}" if group_mean[idx] else ""
+                print(f"- {titles[idx]} ({seen_count[idx]}/{others} of the group{score_text})")
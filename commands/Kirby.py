@@ -8,6 +8,7 @@ class Kirby:
     requires_api = False
     requires_parameter = False
     requires_username = False
+    reusable = True
 
     def __init__(self):
         self.frames = [
@@ -3,6 +3,7 @@ import json
 class ListCommands:
     requires_api = False         # Indicates this command needs the API URL
     requires_parameter = False   # Indicates this command does not necessarily require a parameter
+    reusable = True  # The same instance serves every run without a parameter
 
     def __init__(self):
         self.commands_file = 'commands.json'
@@ -1,149 +1,160 @@
-import os
-import requests
+import json
+import time
+from anime_service import AniListError
+from list_store import STATUS_LABELS
+
+SYNC_CURSOR_FILE = 'sync_cursor.json'
+
+# Entries deleted on AniList never show up as changes, a periodic full sync catches those
+FULL_SYNC_INTERVAL = 7 * 24 * 3600
+
+# Entries are written to the store in batches as the list streams in
+UPSERT_BATCH_SIZE = 500
+
+ENTRY_SELECTION = """
+                    status
+                    progress
+                    score
+                    updatedAt
+                    media {
+                        id
+                        title {
+                            romaji
+                            english
+                        }
+                    }
+"""
 
 class ManualUpdate:
     requires_api = True
     requires_parameter = False
     requires_username = True
-
-    def __init__(self, api_url, username=None):
+    reusable = True
+
+    def __init__(self, api_url, username=None, *, context):
+        self.context = context
+        # "-ulist --full" forces a complete resync, "-ulist --export" also writes the old text files
+        options = (username or '').split()
+        self.force_full_sync = '--full' in options
+        self.export_files = '--export' in options
+        username = ' '.join(option for option in options if not option.startswith('--'))
         if not username:
-            username = self.get_username_from_file()
+            username = self.context.username
             if not username:
                 raise ValueError("Username is required for ManualUpdate.")
         self.api_url = api_url
         self.username = username
-        self.headers = self.get_headers()
-        self.existing_titles = self.load_existing_titles()
+        self.anime_service = self.context.anime_service
+        self.list_store = self.context.list_store
 
-    @staticmethod
-    def get_username_from_file():
+    def load_sync_cursor(self):
         try:
-            with open('username.txt', 'r') as file:
-                return file.read().strip()
-        except FileNotFoundError:
-            print("Username file not found.")
+            with open(SYNC_CURSOR_FILE, 'r', encoding='utf-8') as file:
+                cursor = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
             return None
-
-    @staticmethod
-    def get_api_token():
-        try:
-            with open('token.txt', 'r') as file:
-                return file.read().strip()
-        except FileNotFoundError:
-            print("Token file not found.")
+        if cursor.get('username', '').lower() != self.username.lower():
             return None
+        return cursor
 
-    def get_headers(self):
-        token = self.get_api_token()
-        return {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-        }
-
-    def load_existing_titles(self):
-        try:
-            with open('watched_anime.txt', 'r', encoding='utf-8') as file:
-                return set(file.read().splitlines())
-        except FileNotFoundError:
-            print("Completed titles file not found.")
-            return set()
+    def save_sync_cursor(self, updated_at, full_sync_at):
+        with open(SYNC_CURSOR_FILE, 'w', encoding='utf-8') as file:
+            json.dump({
+                'username': self.username,
+                'updated_at': updated_at,
+                'last_full_sync': full_sync_at
+            }, file)
 
     def execute(self):
-        query = """
-        query ($userName: String) {
-            MediaListCollection(userName: $userName, type: ANIME) {
-                lists {
-                    entries {
-                        media {
-                            title {
-                                romaji
-                            }
-                        }
-                        status
-                    }
-                }
-            }
-        }
-        """
-        variables = {'userName': self.username}
-        response = requests.post(self.api_url, json={'query': query, 'variables': variables}, headers=self.headers)
-        if response.status_code == 200:
-            self.process_response(response.json())
+        cursor = self.load_sync_cursor()
+        if (self.force_full_sync or cursor is None
+                or time.time() - cursor.get('last_full_sync', 0) > FULL_SYNC_INTERVAL):
+            self.full_sync()
         else:
-            print("Failed to fetch data from API.")
-
-    def process_response(self, json_response):
-        if 'data' in json_response:
-            categorized_titles = {
-                'CURRENTLY_WATCHING': [],
-                'ON_HOLD': [],
-                'DROPPED': [],
-                'PLAN_TO_WATCH': [],
-                'COMPLETED': []
-            }
-            lists = json_response['data']['MediaListCollection']['lists']
-            for list in lists:
-                for entry in list['entries']:
-                    status = entry['status']
-                    title = entry['media']['title']['romaji']
-
-                    if status == 'CURRENT':
-                        categorized_titles['CURRENTLY_WATCHING'].append(title)
-                    elif status == 'PLANNING':
-                        categorized_titles['PLAN_TO_WATCH'].append(title)
-                    elif status == 'PAUSED':
-                        categorized_titles['ON_HOLD'].append(title)
-                    elif status == 'DROPPED':
-                        categorized_titles['DROPPED'].append(title)
-                    elif status == 'COMPLETED':
-                        categorized_titles['COMPLETED'].append(title)
-
-            self.update_titles(categorized_titles)
-        else:
-            print("No useful data in response.")
-
-    def update_titles(self, categorized_titles):
-        file_mapping = {
-            'CURRENTLY_WATCHING': 'currently_watching.txt',
-            'ON_HOLD': 'on_hold.txt',
-            'DROPPED': 'dropped.txt',
-            'PLAN_TO_WATCH': 'plan_to_watch.txt',
-            'COMPLETED': 'watched_anime.txt'
+            self.incremental_sync(cursor)
+
+        if self.export_files:
+            exported = self.list_store.export_text_files()
+            print(f"Exported {', '.join(exported)}")
+
+    def full_sync(self):
+        """Stream the whole list chunk by chunk and store entries as they arrive."""
+        entries = self.anime_service.iter_list_entries(self.username, ENTRY_SELECTION, use_cache=False)
+        try:
+            self.process_entries(entries)
+        except AniListError as e:
+            print(f"Failed to fetch data from API. ({e.status_code})")
+
+    def incremental_sync(self, cursor):
+        """Only download entries changed since the last sync and apply them as row updates."""
+        latest_changes = {}
+        newest = cursor['updated_at']
+        try:
+            for entry in self.anime_service.iter_list_changes(self.username, cursor['updated_at'], ENTRY_SELECTION):
+                newest = max(newest, entry['updatedAt'])
+                # Newest first, so the first entry seen per media is its current state
+                latest_changes.setdefault(entry['media']['id'], entry)
+        except AniListError as e:
+            # Nothing was applied, the next -ulist picks up from the same point
+            print(f"Failed to fetch data from API. ({e.status_code}) Your list was not changed, "
+                  f"the next -ulist continues from the last sync.")
+            return
+
+        known_statuses = self.list_store.statuses_by_media_id()
+        changes = [self.to_store_entry(entry) for entry in latest_changes.values()]
+        self.list_store.upsert_many(changes)
+        self.report_changes(changes, known_statuses, [])
+        self.save_sync_cursor(newest, cursor['last_full_sync'])
+
+    def process_entries(self, entries):
+        known_statuses = self.list_store.statuses_by_media_id()
+        seen_ids = set()
+        changes = []
+        batch = []
+        newest = 0
+        for entry in entries:
+            newest = max(newest, entry.get('updatedAt') or 0)
+            store_entry = self.to_store_entry(entry)
+            seen_ids.add(store_entry['media_id'])
+            batch.append(store_entry)
+            if known_statuses.get(store_entry['media_id']) != store_entry['status']:
+                changes.append(store_entry)
+            if len(batch) >= UPSERT_BATCH_SIZE:
+                self.list_store.upsert_many(batch)
+                batch = []
+        self.list_store.upsert_many(batch)
+
+        # A full sync is the only time entries deleted on AniList can be noticed
+        removed_titles = self.list_store.remove_missing(seen_ids)
+        self.report_changes(changes, known_statuses, removed_titles)
+        self.save_sync_cursor(newest, time.time())
+
+    @staticmethod
+    def to_store_entry(entry):
+        media = entry['media']
+        return {
+            'media_id': media['id'],
+            'status': entry['status'],
+            'progress': entry.get('progress'),
+            'score': entry.get('score'),
+            'title': media['title']['romaji'],
+            'title_english': media['title'].get('english'),
+            'updated_at': entry.get('updatedAt'),
         }
 
-        files_created = 0
-        files_updated = 0
-        total_animes_added = 0
-
-        for category, titles in categorized_titles.items():
-            file_name = file_mapping[category]
-            titles_set = set(titles)  # Converting to set for easier comparison
-
-            if os.path.exists(file_name):
-                with open(file_name, 'r', encoding='utf-8') as file:
-                    current_titles = set(file.read().splitlines())
-            else:
-                current_titles = set()
-
-            # Only update if there are changes
-            if titles_set != current_titles:
-                with open(file_name, 'w', encoding='utf-8') as file:
-                    for title in titles:
-                        file.write(f"{title}\n")
-                if len(current_titles) == 0:
-                    files_created += 1
-                    print(f"Created {file_name}")
-                else:
-                    files_updated += 1
-                    print(f"Updated {file_name}")
-
-                added_animes = len(titles_set - current_titles)
-                total_animes_added += added_animes
-
-                if added_animes > 0:
-                    print(f"Added {added_animes} anime(s) to {file_name}: {', '.join(titles_set - current_titles)}")
-        # Print "Everything is up to date" only if no updates were made
-        if files_updated == 0 and files_created == 0:
+    def report_changes(self, changes, known_statuses, removed_titles):
+        added = [entry for entry in changes if entry['media_id'] not in known_statuses]
+        moved = [entry for entry in changes
+                 if entry['media_id'] in known_statuses and known_statuses[entry['media_id']] != entry['status']]
+        updated = len(changes) - len(added) - len(moved)
+
+        if added:
+            print(f"Added {len(added)} anime(s): {', '.join(entry['title'] for entry in added)}")
+        for entry in moved:
+            print(f"Moved {entry['title']} to {STATUS_LABELS.get(entry['status'], entry['status'])}")
+        if updated:
+            print(f"Updated progress or score of {updated} anime(s)")
+        if removed_titles:
+            print(f"Removed {len(removed_titles)} anime(s): {', '.join(removed_titles)}")
+        if not changes and not removed_titles:
             print("Everything is up to date")
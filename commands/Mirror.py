@@ -0,0 +1,101 @@
+from concurrent.futures import ThreadPoolExecutor
+from catalog_mirror import MIRROR_MEDIA_SELECTION, MIRROR_PER_PAGE
+import time
+
+# Pages are requested this many at a time, the shared rate limiter paces them
+MAX_FETCH_WORKERS = 6
+
+class Mirror:
+    requires_api = True
+    requires_parameter = False
+    reusable = True
+
+    def __init__(self, api_url, options=None, *, context):
+        # "mirror" refreshes what changed, "mirror --full" downloads the whole catalog again
+        self.force_full = '--full' in (options or '').split()
+        self.api_url = api_url
+        self.context = context
+        self.anime_service = self.context.anime_service
+        self.catalog_mirror = self.context.catalog_mirror
+
+    def execute(self):
+        start = time.perf_counter()
+        if self.force_full or not self.catalog_mirror.available:
+            print("Downloading the AniList anime catalog, this takes a few minutes the first time...")
+            media_items = self.download_catalog()
+            if not media_items:
+                print("Nothing was downloaded, the mirror was left as it is.")
+                return
+            self.catalog_mirror.write(media_items, max(media['updatedAt'] or 0 for media in media_items))
+        else:
+            changed = self.download_changes(self.catalog_mirror.meta['max_updated_at'])
+            if changed is None:
+                print("Refresh failed, the mirror was left as it is.")
+                return
+            if not changed:
+                self.catalog_mirror.mark_refreshed()
+                print(f"Catalog mirror is up to date ({self.catalog_mirror.meta['count']} anime).")
+                return
+            print(f"Applying {len(changed)} changed anime...")
+            media_items = self.catalog_mirror.all_media() + changed
+            self.catalog_mirror.write(media_items, max(media['updatedAt'] or 0 for media in media_items))
+        # Built now rather than on the first -s after the refresh
+        self.context.title_index.build()
+        print(f"Catalog mirror holds {self.catalog_mirror.meta['count']} anime "
+              f"({time.perf_counter() - start:.1f}s).")
+
+    def fetch_page(self, page, sort):
+        query = '''
+        query ($page: Int, $perPage: Int, $sort: [MediaSort]) {
+            Page(page: $page, perPage: $perPage) {
+                pageInfo {
+                    hasNextPage
+                }
+                media(type: ANIME, sort: $sort) {
+                    %s
+                }
+            }
+        }
+        ''' % MIRROR_MEDIA_SELECTION
+        variables = {'page': page, 'perPage': MIRROR_PER_PAGE, 'sort': [sort]}
+        # Thousands of one-off pages would only push useful entries out of the response cache
+        response = self.anime_service.post(query, variables, use_cache=False)
+        if response.status_code != 200:
+            print(f"Error fetching catalog page {page}: {response.status_code}")
+            return None
+        return response.json()['data']['Page']
+
+    def download_catalog(self):
+        """Every anime by ascending ID, a wave of pages at a time until the last page shows up."""
+        media_items = []
+        page = 1
+        with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as executor:
+            while True:
+                pages = list(executor.map(lambda number: self.fetch_page(number, 'ID'),
+                                          range(page, page + MAX_FETCH_WORKERS)))
+                for data in pages:
+                    if data is None:
+                        # A gap would silently drop shows, better to keep the old mirror
+                        return []
+                    media_items.extend(data['media'])
+                if not all(data['pageInfo']['hasNextPage'] for data in pages):
+                    return media_items
+                page += MAX_FETCH_WORKERS
+                print(f"Downloaded {len(media_items)} anime...", end='\r')
+
+    def download_changes(self, since):
+        """Anime updated on AniList after `since`, newest first, stopping at the first older one."""
+        changed = []
+        page = 1
+        while True:
+            data = self.fetch_page(page, 'UPDATED_AT_DESC')
+            if data is None:
+                # Applying only part of the changes would move the cursor past the rest
+                return None
+            for media in data['media']:
+                if (media['updatedAt'] or 0) <= since:
+                    return changed
+                changed.append(media)
+            if not data['pageInfo']['hasNextPage']:
+                return changed
+            page += 1
@@ -1,72 +1,201 @@
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from anilist_dates import fuzzy_date
 import json
 
-class Recent:
-    requires_api = True         # Indicates this command needs the API URL
-    requires_parameter = False  # Indicates this command does not necessarily require a parameter
+RECENT_CURSOR_FILE = 'recent_cursor.json'
 
-    def __init__(self, api_url, watched_anime_file='watched_anime.txt'):
-        self.api_url = api_url
-        self.watched_anime = self.load_watched_anime(watched_anime_file)
-        self.headers = self.get_headers()
-
-    @staticmethod
-    def get_headers():
-        token = Recent.get_api_token()
-        return {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-        }
-
-    @staticmethod
-    def get_api_token():
-        try:
-            with open('token.txt', 'r') as file:
-                return file.read().strip()
-        except FileNotFoundError:
-            print("Token file not found.")
-            return None
+# Window used when no --days, --pages or --new is given
+DEFAULT_WINDOW_DAYS = 14
 
-    def load_watched_anime(self, filename):
-        try:
-            with open(filename, 'r') as file:
-                return {line.strip() for line in file}
-        except FileNotFoundError:
-            print(f"Warning: {filename} not found. No anime will be filtered out as watched.")
-            return set()
-
-    def fetch_recent_anime(self):
-        query = '''
-        query {
-            Page(page: 1, perPage: 50) {
-                media(type: ANIME, status: FINISHED, sort: END_DATE_DESC) {
+# Weeks and pages are fetched in parallel, the rate limiter still paces them
+MAX_FETCH_WORKERS = 6
+
+PER_PAGE = 50
+
+MEDIA_SELECTION = """
+                    id
                     title {
                         romaji
                     }
                     siteUrl
                     averageScore
+                    endDate {
+                        year
+                        month
+                        day
+                    }
                     stats {
                         scoreDistribution {
                             score
                             amount
                         }
                     }
+"""
+
+class Recent:
+    requires_api = True         # Indicates this command needs the API URL
+    requires_parameter = False  # Indicates this command does not necessarily require a parameter
+    reusable = True  # The same instance serves every run without a parameter
+
+    def __init__(self, api_url, options=None, *, context):
+        # "recent", "recent 30d", "recent --days=30", "recent --pages=3" or "recent --new"
+        self.days = DEFAULT_WINDOW_DAYS
+        self.pages = None
+        self.only_new = False
+        for option in (options or '').split():
+            name, _, value = option.partition('=')
+            try:
+                if name == '--new':
+                    self.only_new = True
+                elif name == '--days':
+                    self.days = max(int(value), 1)
+                elif name == '--pages':
+                    self.pages = max(int(value), 1)
+                elif option.endswith('d') and option[:-1].isdigit():
+                    self.days = max(int(option[:-1]), 1)
+                else:
+                    print(f"Unknown option '{option}' ignored.")
+            except ValueError:
+                print(f"Invalid value in '{option}' ignored.")
+        self.api_url = api_url
+        self.context = context
+        self.anime_service = self.context.anime_service
+        self.status_index = self.context.status_index
+        self.catalog_mirror = self.context.catalog_mirror
+
+    def is_watched(self, media_id, title):
+        return self.status_index.status_for(media_id, title) == 'COMPLETED'
+
+    def week_windows(self, first_day, last_day):
+        """Split [first_day, last_day] into Monday-Sunday weeks so each week is its own cacheable query.
+
+        Returns (endDate_greater, endDate_lesser, closed) per week, both bounds exclusive.
+        A widened window reuses the weeks it shares with earlier runs.
+        """
+        windows = []
+        week_start = first_day - timedelta(days=first_day.weekday())
+        today = date.today()
+        while week_start <= last_day:
+            next_week = week_start + timedelta(days=7)
+            windows.append((fuzzy_date(week_start - timedelta(days=1)), fuzzy_date(next_week), next_week <= today))
+            week_start = next_week
+        return windows
+
+    def fetch_page(self, page, window=None):
+        """One page of finished anime, newest end date first, optionally limited to one week."""
+        if window is None:
+            query = '''
+            query ($page: Int, $perPage: Int) {
+                Page(page: $page, perPage: $perPage) {
+                    pageInfo {
+                        lastPage
+                    }
+                    media(type: ANIME, status: FINISHED, sort: END_DATE_DESC) {
+                        %s
+                    }
                 }
             }
-        }
-        '''
-        response = requests.post(self.api_url, json={'query': query}, headers=self.headers)
-        if response.status_code == 200:
-            data = response.json()
-            return data['data']['Page']['media']
+            ''' % MEDIA_SELECTION
+            variables = {'page': page, 'perPage': PER_PAGE}
+            cache_kind = None
         else:
+            query = '''
+            query ($page: Int, $perPage: Int, $after: FuzzyDateInt, $before: FuzzyDateInt) {
+                Page(page: $page, perPage: $perPage) {
+                    pageInfo {
+                        lastPage
+                    }
+                    media(type: ANIME, status: FINISHED, sort: END_DATE_DESC, endDate_greater: $after, endDate_lesser: $before) {
+                        %s
+                    }
+                }
+            }
+            ''' % MEDIA_SELECTION
+            after, before, closed = window
+            variables = {'page': page, 'perPage': PER_PAGE, 'after': after, 'before': before}
+            # Weeks that are over hardly change, keep them much longer than the current one
+            cache_kind = 'finished' if closed else None
+        response = self.anime_service.post(query, variables, cache_kind=cache_kind)
+        if response.status_code != 200:
             print(f"Error fetching recently finished anime: {response.status_code}")
+            return [], 0
+        data = response.json()['data']['Page']
+        return data['media'], data['pageInfo'].get('lastPage') or 1
+
+    def fetch_recent_anime(self, first_day=None):
+        """Fetch every page of the requested window concurrently, deduplicated by media ID.
+
+        A date window is answered by the catalog mirror instead while it is fresh.
+        """
+        if not (self.pages and first_day is None) and self.catalog_mirror.fresh:
+            first_day = first_day or date.today() - timedelta(days=self.days - 1)
+            rows = self.catalog_mirror.finished_between(fuzzy_date(first_day), fuzzy_date(date.today()))
+            return [self.catalog_mirror.media(row) for row in rows]
+
+        with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as executor:
+            if self.pages and first_day is None:
+                results = list(executor.map(lambda page: self.fetch_page(page), range(1, self.pages + 1)))
+            else:
+                today = date.today()
+                first_day = first_day or today - timedelta(days=self.days - 1)
+                windows = self.week_windows(first_day, today)
+                # First pages tell us how many more each week has, those go out in a second wave
+                first_pages = list(executor.map(lambda window: self.fetch_page(1, window), windows))
+                extra = [(page, window) for window, (_, last_page) in zip(windows, first_pages)
+                         for page in range(2, last_page + 1)]
+                results = first_pages + list(executor.map(lambda task: self.fetch_page(*task), extra))
+                lower_bound = fuzzy_date(first_day)
+
+        anime_by_id = {}
+        for media, _ in results:
+            for anime in media:
+                anime_by_id.setdefault(anime['id'], anime)
+        recent = list(anime_by_id.values())
+        if first_day is not None:
+            # Weeks are fetched whole, trim the days before the window
+            recent = [anime for anime in recent if fuzzy_date(anime.get('endDate')) >= lower_bound]
+        return recent
+
+    def load_cursor(self):
+        try:
+            with open(RECENT_CURSOR_FILE, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
             return None
 
+    def save_cursor(self, recent_anime, cursor):
+        """Remember the newest end date seen, plus the IDs on that date so they are not shown twice."""
+        newest = max((fuzzy_date(anime.get('endDate')) for anime in recent_anime), default=0)
+        if cursor and cursor['end_date'] > newest:
+            return
+        ids = [anime['id'] for anime in recent_anime if fuzzy_date(anime.get('endDate')) == newest]
+        if cursor and cursor['end_date'] == newest:
+            ids = sorted(set(ids) | set(cursor['ids']))
+        with open(RECENT_CURSOR_FILE, 'w', encoding='utf-8') as file:
+            json.dump({'end_date': newest, 'ids': ids}, file)
+
+    def fetch_new_anime(self, cursor):
+        """Everything that finished since the last look."""
+        end_date = cursor['end_date']
+        first_day = date(end_date // 10000, max(end_date // 100 % 100, 1), max(end_date % 100, 1))
+        seen_ids = set(cursor['ids'])
+        return [anime for anime in self.fetch_recent_anime(first_day)
+                if fuzzy_date(anime.get('endDate')) > end_date or anime['id'] not in seen_ids]
+
     def display_recent_anime(self):
-        recent_anime = self.fetch_recent_anime()
+        cursor = self.load_cursor()
+        if self.only_new and cursor and cursor.get('end_date'):
+            recent_anime = self.fetch_new_anime(cursor)
+            if not recent_anime:
+                print("Nothing new has finished since your last look.")
+                return
+        else:
+            if self.only_new:
+                print(f"No previous look recorded, showing the last {self.days} days.")
+            recent_anime = self.fetch_recent_anime()
         if recent_anime:
+            self.save_cursor(recent_anime, cursor)
             enhanced_anime_list = []
             for anime in recent_anime:
                 title = anime['title']['romaji']
@@ -76,13 +205,12 @@ class Recent:
                     score = self.calculate_mean_score(anime['stats']['scoreDistribution'])
                 if score is None:
                     score = 0  # Ensures all items can be sorted even if no score is provided
+                if self.is_watched(anime.get('id'), title):
+                    continue
                 enhanced_anime_list.append((title, score, url))
 
-            # Filter by score and watched status
-            filtered_anime_list = [
-                anime for anime in enhanced_anime_list
-                if anime[1] >= 65 and anime[0] not in self.watched_anime
-            ]
+            # Filter by score
+            filtered_anime_list = [anime for anime in enhanced_anime_list if anime[1] >= 65]
 
             # Sort by score in descending order
             sorted_anime_list = sorted(filtered_anime_list, key=lambda x: x[1], reverse=True)
@@ -0,0 +1,182 @@
+from concurrent.futures import ThreadPoolExecutor
+from anime_service import AniListError
+import numpy as np
+import time
+
+# Candidate pool: the most popular anime, fetched once and then served from the response cache
+CANDIDATE_PAGES = 40
+PER_PAGE = 50
+MAX_FETCH_WORKERS = 6
+
+DEFAULT_TOP = 15
+
+# Tags ranked below this are too incidental to describe a show
+MIN_TAG_RANK = 60
+
+CANDIDATE_QUERY = '''
+query ($page: Int, $perPage: Int) {
+    Page(page: $page, perPage: $perPage) {
+        media(type: ANIME, sort: POPULARITY_DESC, isAdult: false) {
+            id
+            title {
+                romaji
+            }
+            siteUrl
+            averageScore
+            genres
+            tags {
+                name
+                rank
+            }
+        }
+    }
+}
+'''
+
+PROFILE_QUERY = '''
+query ($userName: String) {
+    User(name: $userName) {
+        statistics {
+            anime {
+                meanScore
+                genres {
+                    genre
+                    count
+                    meanScore
+                }
+                tags(limit: 100) {
+                    tag {
+                        name
+                    }
+                    count
+                    meanScore
+                }
+            }
+        }
+    }
+}
+'''
+
+class Recommend:
+    requires_api = True
+    requires_parameter = False
+    requires_username = True
+    reusable = True
+
+    def __init__(self, api_url, username=None, *, context):
+        self.context = context
+        # "recommend", "recommend --top=30" or "recommend someone --top=30"
+        options = (username or '').split()
+        self.top = DEFAULT_TOP
+        for option in options:
+            if option.startswith('--top='):
+                try:
+                    self.top = max(int(option.split('=', 1)[1]), 1)
+                except ValueError:
+                    print(f"Invalid value in '{option}' ignored.")
+        username = ' '.join(option for option in options if not option.startswith('--'))
+        if not username:
+            username = self.context.username
+            if not username:
+                raise ValueError("Username is required for Recommend.")
+        self.api_url = api_url
+        self.username = username
+        self.anime_service = self.context.anime_service
+        self.status_index = self.context.status_index
+
+    def execute(self):
+        try:
+            profile = self.fetch_profile(self.username)
+        except AniListError as e:
+            print(f"Failed to fetch user stats for {self.username}: {e.status_code}")
+            return
+        candidates = self.fetch_candidates()
+        if not candidates:
+            print("No candidates available.")
+            return
+
+        start = time.perf_counter()
+        ranked = self.rank(candidates, profile)
+        elapsed = time.perf_counter() - start
+        if not ranked:
+            print("Everything in the candidate pool is already on your lists.")
+            return
+
+        print(f"Recommended for {self.username} (scored {len(candidates)} candidates in {elapsed * 1000:.1f} ms):")
+        for idx, (anime, similarity) in enumerate(ranked, start=1):
+            score = anime['averageScore']
+            score_display = f"{score}%" if score else "N/A"
+            print(f"{idx}. {anime['title']['romaji']} ({score_display}, match {similarity * 100:.0f}%)")
+            print(f"   {anime['siteUrl']}")
+
+    def fetch_profile(self, username):
+        """My genre and tag statistics. Cached for a day, taste does not move that fast."""
+        response = self.anime_service.post(PROFILE_QUERY, {"userName": username}, cache_kind='profile')
+        if response.status_code != 200:
+            raise AniListError(f"Failed to fetch user stats for {username}: {response.status_code}", response)
+        return response.json()['data']['User']['statistics']['anime']
+
+    def fetch_page(self, page):
+        response = self.anime_service.post(CANDIDATE_QUERY, {'page': page, 'perPage': PER_PAGE})
+        if response.status_code != 200:
+            print(f"Error fetching candidate page {page}: {response.status_code}")
+            return []
+        return response.json()['data']['Page']['media']
+
+    def fetch_candidates(self):
+        with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as executor:
+            pages = list(executor.map(self.fetch_page, range(1, CANDIDATE_PAGES + 1)))
+        candidates = {}
+        for media in pages:
+            for anime in media:
+                candidates.setdefault(anime['id'], anime)
+        return list(candidates.values())
+
+    @staticmethod
+    def preference_weights(profile):
+        """Feature name -> weight. How much I watch a genre/tag, scaled by how I rate it."""
+        overall_mean = profile.get('meanScore') or 70
+        weights = {}
+        for entry in profile.get('genres') or []:
+            weights[entry['genre']] = entry['count'] * (entry['meanScore'] or overall_mean) / overall_mean
+        for entry in profile.get('tags') or []:
+            name = f"tag:{entry['tag']['name']}"
+            weights[name] = entry['count'] * (entry['meanScore'] or overall_mean) / overall_mean
+        return weights
+
+    def rank(self, candidates, profile):
+        """Cosine similarity of every candidate against my preference vector, in one matrix product."""
+        candidates = [anime for anime in candidates if not self.status_index.is_listed(anime['id'], anime['title']['romaji'])]
+        if not candidates:
+            return []
+
+        weights = self.preference_weights(profile)
+        features = {name: idx for idx, name in enumerate(weights)}
+        matrix = np.zeros((len(candidates), len(features)), dtype=np.float32)
+        # Squared weight of the features I have no statistics for, they only add to the candidate's norm
+        other = np.zeros(len(candidates), dtype=np.float32)
+        for row, anime in enumerate(candidates):
+            for genre in anime.get('genres') or []:
+                column = features.get(genre)
+                if column is not None:
+                    matrix[row, column] = 1.0
+                else:
+                    other[row] += 1.0
+            for tag in anime.get('tags') or []:
+                if (tag.get('rank') or 0) < MIN_TAG_RANK:
+                    continue
+                column = features.get(f"tag:{tag['name']}")
+                if column is not None:
+                    matrix[row, column] = tag['rank'] / 100
+                else:
+                    other[row] += (tag['rank'] / 100) ** 2
+
+        preference = np.array(list(weights.values()), dtype=np.float32)
+        norms = np.sqrt((matrix * matrix).sum(axis=1) + other) * np.linalg.norm(preference)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            similarity = np.where(norms > 0, matrix @ preference / norms, 0.0)
+
+        # Between equally close matches prefer the better rated show
+        quality = np.array([(anime.get('averageScore') or 50) / 100 for anime in candidates], dtype=np.float32)
+        order = np.argsort(-(similarity * quality))[:self.top]
+        return [(candidates[idx], float(similarity[idx])) for idx in order if similarity[idx] > 0]
@@ -1,86 +1,15 @@
 import requests
+from catalog_mirror import FINAL_STATUSES
+from query_batcher import build_field
 from colorama import Fore, Style, init
 
 # Initialize colorama
 init(autoreset=True)
 
-class SearchAnime:
-    requires_api = True
-    requires_parameter = True
-
-    def __init__(self, api_url, anime_title):
-        self.api_url = api_url
-        self.anime_title = anime_title
-        self.headers = self.get_headers()
-
-    @staticmethod
-    def get_api_token():
-        try:
-            with open('token.txt', 'r') as file:
-                return file.read().strip()
-        except FileNotFoundError:
-            print("Token file not found.")
-            return None
-
-    @staticmethod
-    def get_headers():
-        token = SearchAnime.get_api_token()
-        if token:
-            return {
-                'Authorization': f'Bearer {token}',
-                'Content-Type': 'application/json',
-                'Accept': 'application/json',
-            }
-        else:
-            print("No token available.")
-            return {}
-
-    @staticmethod
-    def is_anime_in_file(anime_title, filename):
-        try:
-            anime_title_normalized = anime_title.lower().strip()
-            with open(filename, 'r', encoding='utf-8') as file:
-                for line in file:
-                    title_part = line.split(':')[0].strip().lower()
-                    if anime_title_normalized == title_part:
-                        return True
-            return False
-        except FileNotFoundError:
-            return False
-
-    def get_watched_status(self, anime_title):
-        anime_title = anime_title.lower().strip()
-
-        if self.is_anime_in_file(anime_title, 'currently_watching.txt'):
-            return "Currently watching"
-        elif self.is_anime_in_file(anime_title, 'on_hold.txt'):
-            return "On hold"
-        elif self.is_anime_in_file(anime_title, 'dropped.txt'):
-            return "Dropped"
-        elif self.is_anime_in_file(anime_title, 'plan_to_watch.txt'):
-            return "Plan to watch"
-        elif self.is_anime_in_file(anime_title, 'watched_anime.txt'):
-            return "Watched"
-        else:
-            return "Not Seen"
-
-    def is_watched(self, anime_title):
-        return any([
-            self.is_anime_in_file(anime_title, 'currently_watching.txt'),
-            self.is_anime_in_file(anime_title, 'on_hold.txt'),
-            self.is_anime_in_file(anime_title, 'dropped.txt'),
-            self.is_anime_in_file(anime_title, 'plan_to_watch.txt'),
-            self.is_anime_in_file(anime_title, 'watched_anime.txt')
-        ])
-
-    def execute(self):
-        self.search_anime()
+# A local match scoring at least this much (0-100) skips the API search
+LOCAL_MATCH_SCORE = 85
 
-    def search_anime(self):
-        query = """
-        query ($name: String) {
-            Page {
-                media(search: $name, type: ANIME) {
+MEDIA_DETAILS_SELECTION = """
                     id
                     title {
                         romaji
@@ -104,6 +33,7 @@ class SearchAnime:
                         edges {
                             node {
                                 mediaRecommendation {
+                                    id
                                     title {
                                         romaji
                                     }
@@ -112,16 +42,98 @@ class SearchAnime:
                             }
                         }
                     }
+"""
+
+class SearchAnime:
+    requires_api = True
+    requires_parameter = True
+
+    def __init__(self, api_url, anime_title, *, context):
+        self.api_url = api_url
+        self.anime_title = anime_title
+        self.context = context
+        self.anime_service = self.context.anime_service
+        self.status_index = self.context.status_index
+        self.catalog_mirror = self.context.catalog_mirror
+        self.title_index = self.context.title_index
+
+    def get_watched_status(self, anime_title, media_id=None):
+        return self.status_index.status_label(media_id, anime_title)
+
+    def is_watched(self, anime_title, media_id=None):
+        return self.status_index.is_listed(media_id, anime_title)
+
+    def execute(self):
+        matches = self.title_index.search(self.anime_title)
+        if matches and matches[0][1] >= LOCAL_MATCH_SCORE:
+            self.show_local_match(matches)
+        else:
+            self.search_anime()
+
+    def show_local_match(self, matches):
+        """Resolve the title locally, then only go to the API for details the mirror cannot vouch for.
+
+        Finished shows are shown straight from the mirror and only their
+        recommendations are fetched by ID. Airing shows get fresh details by
+        ID for the countdown, falling back to the mirror when offline.
+        """
+        row = matches[0][0]
+        anime = self.catalog_mirror.media(row)
+        details = None
+        if anime['status'] not in FINAL_STATUSES:
+            try:
+                details = self.fetch_details(anime['id'])
+            except requests.RequestException:
+                print("Offline, showing the catalog mirror's copy.")
+        if details is None:
+            anime['recommendations'] = self.fetch_recommendations(anime['id'])
+            details = anime
+        self.display_anime_details(details)
+
+        others = [self.catalog_mirror.media(other)['title']['romaji']
+                  for other, score in matches[1:] if score >= LOCAL_MATCH_SCORE]
+        if others:
+            print(f"{Fore.LIGHTBLACK_EX}Also matching: {', '.join(others)}")
+
+    def fetch_recommendations(self, media_id):
+        field = build_field('Media', {'id': media_id}, """
+                recommendations {
+                    edges {
+                        node {
+                            mediaRecommendation {
+                                id
+                                title {
+                                    romaji
+                                }
+                                averageScore
+                            }
+                        }
+                    }
+                }
+        """)
+        try:
+            anime = self.anime_service.batcher.fetch(field)
+        except requests.RequestException:
+            print("Recommendations are not available offline.")
+            return {}
+        return (anime or {}).get('recommendations') or {}
+
+    def fetch_details(self, media_id):
+        """Full details of one ID, e.g. a locally resolved search. None when AniList has nothing."""
+        return self.anime_service.batcher.fetch(build_field('Media', {'id': media_id}, MEDIA_DETAILS_SELECTION))
+
+    def search_anime(self):
+        query = """
+        query ($name: String) {
+            Page {
+                media(search: $name, type: ANIME) {
+                    %s
                 }
             }
         }
-        """
+        """ % MEDIA_DETAILS_SELECTION
         variables = {'name': self.anime_title}
-        response = requests.post(
-            self.api_url,
-            json={'query': query, 'variables': variables},
-            headers=self.headers
-        )
+        response = self.anime_service.post(query, variables)
         if response.status_code == 200:
             data = response.json()
             media_list = data['data']['Page']['media']
@@ -136,13 +148,13 @@ class SearchAnime:
     def display_anime_details(self, anime):
         anime_title = anime['title']['romaji']
         episodes = anime.get('episodes', 'N/A')
-        year = anime.get('startDate', {}).get('year', 'Unknown')
+        year = (anime.get('startDate') or {}).get('year') or 'Unknown'
         average_score = anime.get('averageScore')
         popularity = anime.get('popularity', 'N/A')
         genres = ', '.join(anime.get('genres', []))
         site_url = anime['siteUrl']
-        watched_status = self.get_watched_status(anime_title)
-        media_format = anime.get('format', 'N/A')
+        watched_status = self.get_watched_status(anime_title, anime['id'])
+        media_format = anime.get('format') or 'N/A'
 
         # Determine score to display (average score or popularity)
         if average_score is None:
@@ -205,7 +217,8 @@ class SearchAnime:
                 for rec in recommendations
                 if rec['node']['mediaRecommendation']
                 and rec['node']['mediaRecommendation'].get('title')
-                and not self.is_watched(rec['node']['mediaRecommendation']['title'].get('romaji', '').lower())
+                and not self.is_watched(rec['node']['mediaRecommendation']['title'].get('romaji', ''),
+                                        rec['node']['mediaRecommendation'].get('id'))
                 and (rec['node']['mediaRecommendation'].get('averageScore') or 0) >= 65
             ]
 
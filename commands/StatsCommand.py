@@ -1,87 +1,24 @@
 # statscommand.py
-import requests
-import json
 
 class StatsCommand:
     requires_api = True  # Indicates this command needs the API URL
     requires_parameter = False  # Indicates this command does not require a parameter
     requires_username = True  # Indicates this command requires a username
+    reusable = True  # The same instance serves every run without a parameter
 
-    def __init__(self, api_url, username=None):
+    def __init__(self, api_url, username=None, *, context):
+        self.context = context
         if not username:
-            username = self.get_username_from_file()
+            username = self.context.username
             if not username:
                 raise ValueError("Username is required for StatsCommand.")
         self.api_url = api_url
         self.username = username
-        self.headers = self.get_headers()
-
-    @staticmethod
-    def get_username_from_file():
-        try:
-            with open('username.txt', 'r') as file:
-                return file.read().strip()
-        except FileNotFoundError:
-            print("Username file not found.")
-            return None
-
-    @staticmethod
-    def get_headers():
-        token = StatsCommand.get_api_token()
-        return {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-        }
-
-    @staticmethod
-    def get_api_token():
-        """Static method to retrieve the API token from a file."""
-        try:
-            with open('token.txt', 'r') as file:
-                return file.read().strip()
-        except FileNotFoundError:
-            print("Token file not found.")
-            return None
+        self.anime_service = self.context.anime_service
 
     def fetch_user_stats(self):
-        """Fetch user statistics using GraphQL query."""
-        query = """
-        query ($userName: String) {
-          User(name: $userName) {
-            statistics {
-              anime {
-                statuses {
-                  status
-                  count
-                }
-                meanScore
-                episodesWatched
-                minutesWatched
-                genres { 
-                    genre
-                    count
-                    meanScore
-                }
-              }
-            }
-            siteUrl
-          }
-        }
-        """
-        variables = {"userName": self.username}
-        response = requests.post(self.api_url, json={"query": query, "variables": variables}, headers=self.headers)
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"Failed to fetch user stats for {self.username}: {response.status_code}")
-            try:
-                error_details = response.json()
-                print("Error details:", json.dumps(error_details, indent=4))
-            except json.JSONDecodeError:
-                print("Failed to decode JSON from response.")
-            return None
+        """Fetch user statistics through the shared AniList client."""
+        return self.anime_service.fetch_user_stats(self.username)
 
     def execute(self):
         user_data = self.fetch_user_stats()
@@ -4,6 +4,7 @@ import requests
 from lxml import html
 import urllib.parse
 import re
+from http_policy import get_with_retries
 
 class SteamGameLookup:
     requires_api = False
@@ -36,7 +37,7 @@ class SteamGameLookup:
 
     def get_game_id(self, game_title):
         url = f"https://store.steampowered.com/search/?term={urllib.parse.quote_plus(game_title)}"
-        response = self.session.get(url)
+        response = get_with_retries(url, session=self.session)
         if response.status_code != 200:
             return None, "Failed to connect to Steam."
         game_ids = html.fromstring(response.content).xpath('//a[@data-ds-appid]/@data-ds-appid')
@@ -49,10 +50,10 @@ class SteamGameLookup:
 
     def fetch_game_details(self, game_id):
         url = f"https://store.steampowered.com/app/{game_id}/"
-        response = self.session.get(url, allow_redirects=True)
+        response = get_with_retries(url, session=self.session, allow_redirects=True)
         if "agecheck" in response.url:
             url = response.url.replace('agecheck', 'app')
-        response = self.session.get(url)
+        response = get_with_retries(url, session=self.session)
         if response.status_code != 200:
             return "Failed to access game page on Steam."
         page = html.fromstring(response.content)
@@ -74,7 +75,7 @@ class SteamGameLookup:
 
     def fetch_player_stats(self, game_id):
         url = f"https://steamcharts.com/app/{game_id}"
-        response = self.session.get(url)
+        response = get_with_retries(url, session=self.session)
         if response.status_code != 200:
             return {"hour": "Data not available", "day": "Data not available"}
 
@@ -1,33 +1,19 @@
-import requests
-import json
+from query_batcher import GraphQLEnum, build_field
+from relation_graph import RELATION_MEDIA_SELECTION
+
 class Time:
     requires_api = True
     requires_parameter = True
 
-    def __init__(self, api_url, anime_name=None):
+    def __init__(self, api_url, anime_name=None, *, context):
         if not anime_name:
             raise ValueError("Anime name is required for Time.")
         self.api_url = api_url
         self.anime_name = anime_name
-        self.headers = self.get_headers()
-
-    @staticmethod
-    def get_headers():
-        token = Time.get_api_token()
-        return {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-        }
-
-    @staticmethod
-    def get_api_token():
-        try:
-            with open('token.txt', 'r') as file:
-                return file.read().strip()
-        except FileNotFoundError:
-            print("Token file not found.")
-            return None
+        self.context = context
+        self.anime_service = self.context.anime_service
+        self.relation_graph = self.context.relation_graph
+        self.catalog_mirror = self.context.catalog_mirror
 
     def execute(self):
         if self.anime_name:
@@ -36,50 +22,47 @@ class Time:
             print("Anime name is required for this command.")
 
     def get_anime_duration(self, anime_name):
-        query = """
-        query ($search: String) {
-          Media(search: $search, type: ANIME) {
-            title {
-              romaji
-            }
-            episodes
-            duration
-            relations {
-              edges {
-                node {
-                  title {
-                    romaji
-                  }
-                  type
-                }
-                relationType
-              }
-            }
-          }
-        }
+        """Look up the first season by title. Everything after it is followed by ID.
+
+        A title the catalog mirror knows is resolved to its ID locally, and
+        then served from the relation graph when that has it.
         """
-        variables = {"search": anime_name}
-        response = requests.post(self.api_url, json={"query": query, "variables": variables}, headers=self.headers)
-
-        if response.status_code == 200:
-            try:
-                data = response.json()
-                if 'data' in data and 'Media' in data['data']:
-                    return data['data']['Media']
-                else:
-                    print(f"No data available for {anime_name}.")
-                    return None
-            except json.JSONDecodeError:
-                print("Failed to decode JSON from response.")
-                return None
+        row = self.catalog_mirror.find_title(anime_name)
+        if row is not None:
+            level = self.get_anime_by_ids([self.catalog_mirror.media(row)['id']])
+            if level:
+                return level[0]
+
+        field = build_field('Media', {'search': anime_name, 'type': GraphQLEnum('ANIME')}, RELATION_MEDIA_SELECTION)
+        anime_data = self.anime_service.batcher.fetch(field)
+        if anime_data is None:
+            print(f"No data available for {anime_name}.")
         else:
-            print(f"Failed to fetch anime data for {anime_name}: {response.status_code}")
-            print("Response content:", response.content)
-            return None
+            self.relation_graph.record_media([anime_data])
+        return anime_data
+
+    def get_anime_by_ids(self, media_ids):
+        """Fetch a whole BFS level of sequels, local graph first and the rest in one batched request."""
+        stored = self.relation_graph.stored_media(media_ids)
+        for anime_data in stored:
+            # The mirror is refreshed more often than graph nodes, airing shows gain episodes
+            row = self.catalog_mirror.row_of(anime_data['id'])
+            if row is not None and self.catalog_mirror.usable(row):
+                mirrored = self.catalog_mirror.media(row)
+                anime_data['episodes'] = mirrored['episodes'] or anime_data['episodes']
+                anime_data['duration'] = mirrored['duration'] or anime_data['duration']
+        stored_ids = {anime_data['id'] for anime_data in stored}
+        missing = [media_id for media_id in media_ids if media_id not in stored_ids]
+        if not missing:
+            return stored
+        fields = [build_field('Media', {'id': media_id}, RELATION_MEDIA_SELECTION) for media_id in missing]
+        fetched = [anime_data for anime_data in self.anime_service.batcher.fetch_many(fields) if anime_data]
+        self.relation_graph.record_media(fetched)
+        return stored + fetched
 
     def calculate_watch_time(self, anime_data):
-        episodes = anime_data.get('episodes', 0)
-        duration = anime_data.get('duration', 0)
+        episodes = anime_data.get('episodes') or 0
+        duration = anime_data.get('duration') or 0
 
         if episodes == 0 or duration == 0:
             return 0
@@ -89,43 +72,33 @@ class Time:
         return episodes * adjusted_duration
 
     def calculate_total_watch_time(self, anime_name):
+        first_season = self.get_anime_duration(anime_name)
+        if first_season is None:
+            return
+
+        total_minutes_original = self.calculate_watch_time(first_season)
+        total_episodes_original = first_season.get('episodes') or 0
         total_minutes_all = 0
-        total_minutes_original = 0
         total_episodes_all = 0
-        anime_queue = [anime_name]
-        processed_anime = set()
-        season_counter = 1
         total_seasons = 0
 
-        while anime_queue:
-            current_anime = anime_queue.pop(0)
-            if current_anime in processed_anime:
-                continue
-
-            anime_data = self.get_anime_duration(current_anime)
-            if anime_data is None:
-                continue
-
-            # Calculate watch time for the current anime
-            watch_time = self.calculate_watch_time(anime_data)
-            total_minutes_all += watch_time
-
-            # Only calculate and store details for season 1, but do not print
-            if season_counter == 1:
-                total_minutes_original = watch_time
-                total_episodes_original = anime_data.get('episodes', 0)
-
-            total_episodes_all += anime_data.get('episodes', 0)
-            season_counter += 1
-            total_seasons += 1
-            processed_anime.add(current_anime)
-
-            # Check for sequels and add them to the queue
-            if 'relations' in anime_data and 'edges' in anime_data['relations']:
-                for relation in anime_data['relations']['edges']:
-                    if relation['relationType'] == 'SEQUEL' and relation['node']['type'] == 'ANIME':
-                        sequel_title = relation['node']['title']['romaji']
-                        anime_queue.append(sequel_title)
+        # Breadth-first over SEQUEL edges, one request per level, visited tracked by media ID
+        visited_ids = {first_season['id']}
+        current_level = [first_season]
+        while current_level:
+            next_level_ids = []
+            for anime_data in current_level:
+                total_minutes_all += self.calculate_watch_time(anime_data)
+                total_episodes_all += anime_data.get('episodes') or 0
+                total_seasons += 1
+
+                for relation in (anime_data.get('relations') or {}).get('edges', []):
+                    node = relation['node']
+                    if relation['relationType'] == 'SEQUEL' and node['type'] == 'ANIME' and node['id'] not in visited_ids:
+                        visited_ids.add(node['id'])
+                        next_level_ids.append(node['id'])
+
+            current_level = self.get_anime_by_ids(next_level_ids) if next_level_ids else []
 
         # Print total details
         print(f"Total Episodes Season 1: {total_episodes_original}")
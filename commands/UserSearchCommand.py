@@ -1,34 +1,15 @@
-import requests
-import json
 
 class UserSearchCommand:
     requires_api = True  # Indicates this command needs the API URL
     requires_parameter = True  # Indicates this command requires a parameter
 
-    def __init__(self, api_url, username=None):
+    def __init__(self, api_url, username=None, *, context):
         if not username:
             raise ValueError("Username is required for UserSearchCommand.")
         self.api_url = api_url
         self.username = username
-        self.headers = self.get_headers()
-
-    @staticmethod
-    def get_headers():
-        token = UserSearchCommand.get_api_token()
-        return {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-        }
-
-    @staticmethod
-    def get_api_token():
-        try:
-            with open('token.txt', 'r') as file:
-                return file.read().strip()
-        except FileNotFoundError:
-            print("Token file not found.")
-            return None
+        self.context = context
+        self.anime_service = self.context.anime_service
 
     def execute(self):
         if self.username:
@@ -41,43 +22,8 @@ class UserSearchCommand:
             print("Username is required for this command.")
 
     def fetch_user_stats(self, username):
-        """Fetch user statistics using GraphQL query."""
-        query = """
-        query ($userName: String) {
-          User(name: $userName) {
-            statistics {
-              anime {
-                statuses {
-                  status
-                  count
-                }
-                meanScore
-                episodesWatched
-                minutesWatched
-                genres { 
-                    genre
-                    count
-                    meanScore
-                }
-              }
-            }
-            siteUrl
-          }
-        }
-        """
-        variables = {"userName": username}
-        response = requests.post(self.api_url, json={"query": query, "variables": variables}, headers=self.headers)
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"Failed to fetch user stats for {username}: {response.status_code}")
-            try:
-                error_details = response.json()
-                print("Error details:", json.dumps(error_details, indent=4))
-            except json.JSONDecodeError:
-                print("Failed to decode JSON from response.")
-            return None
+        """Fetch user statistics through the shared AniList client."""
+        return self.anime_service.fetch_user_stats(username)
 
     def _display_stats(self, user_data):
         stats = user_data['statistics']['anime']
@@ -0,0 +1,65 @@
+from query_batcher import GraphQLEnum, build_field
+from relation_graph import RELATION_MEDIA_SELECTION
+
+class WatchOrder:
+    requires_api = True
+    requires_parameter = True
+
+    def __init__(self, api_url, anime_name=None, *, context):
+        if not anime_name:
+            raise ValueError("Anime name is required for WatchOrder.")
+        self.api_url = api_url
+        self.anime_name = anime_name
+        self.context = context
+        self.anime_service = self.context.anime_service
+        self.relation_graph = self.context.relation_graph
+
+    def execute(self):
+        root_id = self.find_root_id(self.anime_name)
+        if root_id is None:
+            print(f"Anime '{self.anime_name}' not found.")
+            return
+
+        franchise = self.relation_graph.franchise(root_id, self.fetch_media)
+        if not franchise:
+            print(f"No data available for {self.anime_name}.")
+            return
+        self.display_watch_order(franchise)
+
+    def find_root_id(self, anime_name):
+        """Use the local graph when the title is already known, otherwise search AniList."""
+        root_id = self.relation_graph.find_by_title(anime_name)
+        if root_id is not None:
+            return root_id
+
+        field = build_field('Media', {'search': anime_name, 'type': GraphQLEnum('ANIME')}, RELATION_MEDIA_SELECTION)
+        anime_data = self.anime_service.batcher.fetch(field)
+        if anime_data is None:
+            return None
+        self.relation_graph.record_media([anime_data])
+        return anime_data['id']
+
+    def fetch_media(self, media_ids):
+        """Download only the frontier nodes the graph does not have yet."""
+        fields = [build_field('Media', {'id': media_id}, RELATION_MEDIA_SELECTION) for media_id in media_ids]
+        return [anime_data for anime_data in self.anime_service.batcher.fetch_many(fields) if anime_data]
+
+    def display_watch_order(self, franchise):
+        total_minutes = 0
+        total_episodes = 0
+        print(f"Watch order ({len(franchise)} entries):")
+        for idx, node in enumerate(franchise, start=1):
+            episodes = node['episodes'] or 0
+            duration = node['duration'] or 0
+            total_minutes += episodes * duration
+            total_episodes += episodes
+
+            year = node['start_date'] // 10000 if node['start_date'] else 'TBA'
+            media_format = (node['format'] or 'N/A').replace('_', ' ')
+            episode_text = f"{episodes} eps x {duration} min" if episodes else "episodes unknown"
+            print(f"{idx}. {node['title']} ({media_format}, {year}) - {episode_text}")
+
+        days, remainder = divmod(int(total_minutes), 24 * 60)
+        hours, minutes = divmod(remainder, 60)
+        print(f"Total Episodes: {total_episodes}")
+        print(f"Total runtime: {days} days, {hours} hours, {minutes} minutes")
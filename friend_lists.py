@@ -0,0 +1,193 @@
+import json
+import sqlite3
+import threading
+import time
+
+FRIEND_LISTS_FILE = 'friend_lists.db'
+
+# Margin for clock differences between us and AniList when starting a cursor
+CURSOR_MARGIN = 60
+
+# Removed entries never show up in the changes feed, a periodic full fetch catches those
+FRIEND_FULL_REFRESH = 3 * 24 * 3600
+
+# Rows written to / read from the database per step while a list streams through
+STREAM_BATCH_SIZE = 500
+
+ENTRY_COLUMNS = 'username, media_id, title, score, genres, average_score, updated_at'
+
+# Everything Compare and GroupCompare need from a friend's entry
+FRIEND_ENTRY_SELECTION = """
+                status
+                score(format: POINT_100)
+                updatedAt
+                media {
+                  id
+                  title {
+                    romaji
+                  }
+                  genres
+                  averageScore
+                }
+"""
+
+
+class FriendLists:
+    """Local snapshots of other users' completed lists.
+
+    Each snapshot remembers when it was fully fetched and how far into the
+    user's updatedAt timeline it is current. A repeat compare only pages through the user's
+    changes feed back to that point, usually a single request, and applies
+    the changed entries to the snapshot.
+    """
+
+    def __init__(self, path=FRIEND_LISTS_FILE):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    username TEXT PRIMARY KEY,
+                    fetched_at REAL NOT NULL,
+                    max_updated_at INTEGER NOT NULL
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    username TEXT NOT NULL,
+                    media_id INTEGER NOT NULL,
+                    title TEXT,
+                    score REAL,
+                    genres TEXT,
+                    average_score INTEGER,
+                    updated_at INTEGER,
+                    PRIMARY KEY (username, media_id)
+                )
+            """)
+            # A full fetch streams into here and is swapped into entries once it is complete
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS staged_entries (
+                    username TEXT NOT NULL,
+                    media_id INTEGER NOT NULL,
+                    title TEXT,
+                    score REAL,
+                    genres TEXT,
+                    average_score INTEGER,
+                    updated_at INTEGER,
+                    PRIMARY KEY (username, media_id)
+                )
+            """)
+            self.conn.commit()
+
+    def completed(self, anime_service, username):
+        """Yield the user's completed entries, refreshing the snapshot first.
+
+        Entries are dicts with id, title, score, genres and averageScore,
+        read from the database a batch at a time. Raises AniListError when
+        the list cannot be fetched.
+        """
+        key = username.lower()
+        with self.lock:
+            row = self.conn.execute('SELECT fetched_at, max_updated_at FROM users WHERE username = ?',
+                                    (key,)).fetchone()
+        if row is None or time.time() - row[0] > FRIEND_FULL_REFRESH:
+            self._full_fetch(anime_service, username)
+        else:
+            self._apply_changes(anime_service, username, row[1])
+        yield from self._load(key)
+
+    def _full_fetch(self, anime_service, username):
+        """Stream the whole list into staged_entries page by page, then swap it in with one commit.
+
+        The lock is only held per batch, so several users can be fetched in
+        parallel. A failed fetch drops what was staged and leaves the old
+        snapshot as it was.
+        """
+        # Anything changed after the fetch started shows up in the changes feed next time
+        started = time.time()
+        key = username.lower()
+        with self.lock:
+            self.conn.execute('DELETE FROM staged_entries WHERE username = ?', (key,))
+            self.conn.commit()
+        try:
+            batch = []
+            for entry in anime_service.iter_list_entries(username, FRIEND_ENTRY_SELECTION, status="COMPLETED",
+                                                         use_cache=False):
+                batch.append(entry)
+                if len(batch) >= STREAM_BATCH_SIZE:
+                    self._stage(key, batch)
+                    batch = []
+            self._stage(key, batch)
+        except BaseException:
+            with self.lock:
+                self.conn.rollback()
+                self.conn.execute('DELETE FROM staged_entries WHERE username = ?', (key,))
+                self.conn.commit()
+            raise
+        with self.lock:
+            try:
+                self.conn.execute('DELETE FROM entries WHERE username = ?', (key,))
+                self.conn.execute(f'INSERT INTO entries ({ENTRY_COLUMNS}) '
+                                  f'SELECT {ENTRY_COLUMNS} FROM staged_entries WHERE username = ?', (key,))
+                self.conn.execute('DELETE FROM staged_entries WHERE username = ?', (key,))
+                self._save_cursor(key, started, int(started) - CURSOR_MARGIN)
+                self.conn.commit()
+            except sqlite3.Error:
+                self.conn.rollback()
+                raise
+
+    def _stage(self, key, entries):
+        if not entries:
+            return
+        with self.lock:
+            self._store(key, entries, table='staged_entries')
+            self.conn.commit()
+
+    def _apply_changes(self, anime_service, username, since):
+        changes = {}
+        for entry in anime_service.iter_list_changes(username, since, FRIEND_ENTRY_SELECTION):
+            # Newest first, the first one seen per media is its current state
+            changes.setdefault(entry['media']['id'], entry)
+        if not changes:
+            return
+        key = username.lower()
+        completed = [entry for entry in changes.values() if entry['status'] == 'COMPLETED']
+        # Anything that changed to another status is no longer on the completed list
+        gone = [(key, media_id) for media_id, entry in changes.items() if entry['status'] != 'COMPLETED']
+        with self.lock:
+            self.conn.executemany('DELETE FROM entries WHERE username = ? AND media_id = ?', gone)
+            self._store(key, completed)
+            fetched_at = self.conn.execute('SELECT fetched_at FROM users WHERE username = ?', (key,)).fetchone()[0]
+            self._save_cursor(key, fetched_at, max(entry['updatedAt'] for entry in changes.values()))
+            self.conn.commit()
+
+    def _store(self, key, entries, table='entries'):
+        self.conn.executemany(
+            f'INSERT OR REPLACE INTO {table} ({ENTRY_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [(key, entry['media']['id'], entry['media']['title']['romaji'], entry.get('score') or None,
+              json.dumps(entry['media'].get('genres') or []), entry['media'].get('averageScore'),
+              entry.get('updatedAt'))
+             for entry in entries]
+        )
+
+    def _save_cursor(self, key, fetched_at, max_updated_at):
+        self.conn.execute('INSERT OR REPLACE INTO users (username, fetched_at, max_updated_at) VALUES (?, ?, ?)',
+                          (key, fetched_at, max_updated_at))
+
+    def _load(self, key):
+        """Rows of one user, fetched STREAM_BATCH_SIZE at a time. Nothing is held between batches."""
+        last_media_id = -1
+        while True:
+            # Keyset paging, so no cursor stays open on the shared connection between batches
+            with self.lock:
+                rows = self.conn.execute(
+                    'SELECT media_id, title, score, genres, average_score FROM entries '
+                    'WHERE username = ? AND media_id > ? ORDER BY media_id LIMIT ?',
+                    (key, last_media_id, STREAM_BATCH_SIZE)
+                ).fetchall()
+            for row in rows:
+                yield {'id': row[0], 'title': row[1], 'score': row[2], 'genres': json.loads(row[3]),
+                       'averageScore': row[4] or 'N/A'}
+            if len(rows) < STREAM_BATCH_SIZE:
+                return
+            last_media_id = rows[-1][0]
@@ -0,0 +1,110 @@
+import random
+import re
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+import requests
+
+# (connect, read) timeouts in seconds per host. Anything not listed gets DEFAULT_TIMEOUT.
+ENDPOINT_TIMEOUTS = {
+    'graphql.anilist.co': (3.05, 15),
+    'anilist.co': (3.05, 10),
+    'raw.githubusercontent.com': (3.05, 5),
+    'api.github.com': (3.05, 10),
+    'store.steampowered.com': (3.05, 10),
+    'steamcharts.com': (3.05, 8),
+}
+DEFAULT_TIMEOUT = (3.05, 10)
+
+# Server side hiccups worth another try. 429 is handled by the rate limiter instead.
+RETRY_STATUS_CODES = {500, 502, 503, 504}
+
+_MUTATION_PATTERN = re.compile(r'^\s*(#[^\n]*\n\s*)*mutation\b')
+
+
+def timeout_for(url):
+    """Return the (connect, read) timeout to use for a request to url."""
+    host = urlparse(url).hostname or ''
+    return ENDPOINT_TIMEOUTS.get(host, DEFAULT_TIMEOUT)
+
+
+def is_mutation(query):
+    """True if a GraphQL document is a mutation (and so must never be retried blindly)."""
+    return bool(_MUTATION_PATTERN.match(query))
+
+
+class RetryPolicy:
+    """Exponential backoff with jitter for idempotent requests."""
+
+    def __init__(self, max_retries=3, base_delay=0.5, max_delay=8.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt):
+        backoff = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return backoff * random.uniform(0.5, 1.0)
+
+    def call(self, send, retry_on=(requests.ConnectionError, requests.Timeout),
+             retry_statuses=RETRY_STATUS_CODES):
+        """Call send() until it returns a non-retryable response or retries run out."""
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = send()
+            except retry_on:
+                if last_attempt:
+                    raise
+            else:
+                if response.status_code not in retry_statuses or last_attempt:
+                    return response
+            time.sleep(self.delay(attempt))
+
+    def call_mutation(self, send):
+        """Only retry a mutation when the connection was never made.
+
+        Once the request may have reached AniList, a timeout or 5xx says nothing
+        about whether the write was applied, so the response is returned as is.
+        """
+        return self.call(send, retry_on=(requests.ConnectTimeout,), retry_statuses=())
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+def get_with_retries(url, session=None, retry_policy=DEFAULT_RETRY_POLICY, **kwargs):
+    """GET url with the endpoint's timeout and bounded retries."""
+    sender = session or requests
+    kwargs.setdefault('timeout', timeout_for(url))
+    return retry_policy.call(lambda: sender.get(url, **kwargs))
+
+
+class LatencyTracker:
+    """Rolling window of request latencies, used to pick the hedging delay."""
+
+    def __init__(self, window=100, min_samples=10, min_delay=0.05):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def percentile(self, pct):
+        with self.lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def hedge_delay(self):
+        """p95 latency, or None while there are too few samples to trust it."""
+        p95 = self.percentile(95)
+        if p95 is None:
+            return None
+        return max(p95, self.min_delay)
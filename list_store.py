@@ -0,0 +1,333 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+LIST_STORE_FILE = 'anime_lists.db'
+
+# Writes are appended to the write-ahead journal (anime_lists.db-wal). Once it
+# grows past this size a background thread folds it into the database file.
+JOURNAL_COMPACT_BYTES = 1024 * 1024
+
+# If the background checkpoint cannot keep up with back-to-back writes, the
+# writer checkpoints inline once the journal reaches this size
+JOURNAL_FORCE_COMPACT_BYTES = 4 * JOURNAL_COMPACT_BYTES
+
+# A checkpoint that finds the journal busy is retried this many times, backing off a little more each time
+COMPACT_ATTEMPTS = 5
+COMPACT_RETRY_DELAY = 0.05
+
+# AniList status -> the text file it used to live in (still used for --export)
+EXPORT_FILES = {
+    'CURRENT': 'currently_watching.txt',
+    'PAUSED': 'on_hold.txt',
+    'DROPPED': 'dropped.txt',
+    'PLANNING': 'plan_to_watch.txt',
+    'COMPLETED': 'watched_anime.txt',
+    'REPEATING': 'currently_watching.txt',
+}
+
+STATUS_LABELS = {
+    'CURRENT': 'Currently watching',
+    'REPEATING': 'Currently watching',
+    'PAUSED': 'On hold',
+    'DROPPED': 'Dropped',
+    'PLANNING': 'Plan to watch',
+    'COMPLETED': 'Watched',
+}
+
+# "Title: 12 episodes" or "Title: 8" as written by the old -w command
+_LEGACY_SUFFIX = re.compile(r':\s*\d+(\.\d+)?( episodes)?\s*$')
+
+
+def normalize_title(title):
+    title = unicodedata.normalize('NFKC', title)
+    title = title.lower()
+    title = title.replace('×', 'x')
+    return ' '.join(title.split())
+
+
+class ListStore:
+    """Indexed local copy of the user's anime lists.
+
+    One row per list entry, keyed by AniList media ID, so status lookups are
+    a single indexed query and moving between lists is a one-row update.
+    Entries imported from the old text files have no media ID yet and are
+    matched by normalized title until a sync or compare fills the ID in.
+
+    The database runs in WAL mode: every write is one small append to the
+    journal, reads see the journal replayed over the last snapshot, and an
+    interrupted write never leaves half-moved entries behind. Compaction
+    (a checkpoint) happens off the main thread once the journal is big enough.
+    """
+
+    def __init__(self, path=LIST_STORE_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        # Bumped on every write so in-memory indexes know to reload
+        self.version = 0
+        self.compacting = threading.Lock()
+        is_new = not os.path.exists(path)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock:
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            # The journal is fsynced at checkpoints, a crash can lose the last write but never corrupt the list
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            # Checkpoints are run by compact_journal instead of inline on whichever write crosses the limit
+            self.conn.execute('PRAGMA wal_autocheckpoint=0')
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY,
+                    media_id INTEGER UNIQUE,
+                    status TEXT NOT NULL,
+                    progress INTEGER,
+                    score REAL,
+                    title TEXT NOT NULL,
+                    title_english TEXT,
+                    title_key TEXT NOT NULL,
+                    updated_at INTEGER
+                )
+            """)
+            self.conn.execute('CREATE INDEX IF NOT EXISTS entries_title_key ON entries (title_key)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS entries_status ON entries (status)')
+            self.conn.commit()
+        if is_new:
+            self.import_text_files()
+
+    def _upsert(self, entry):
+        title = entry['title']
+        title_key = normalize_title(title)
+        media_id = entry.get('media_id')
+        values = (entry['status'], entry.get('progress'), entry.get('score'), title,
+                  entry.get('title_english'), title_key, entry.get('updated_at') or int(time.time()))
+        if media_id is None:
+            cursor = self.conn.execute(
+                'UPDATE entries SET status = ?, progress = ?, score = ?, title = ?, title_english = ?, '
+                'title_key = ?, updated_at = ? WHERE media_id IS NULL AND title_key = ?',
+                (*values, title_key)
+            )
+            if cursor.rowcount == 0:
+                self.conn.execute(
+                    'INSERT INTO entries (status, progress, score, title, title_english, title_key, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)', values
+                )
+            return
+        # A legacy row for the same title is superseded by the one with a real ID
+        self.conn.execute('DELETE FROM entries WHERE media_id IS NULL AND title_key = ?', (title_key,))
+        self.conn.execute(
+            'INSERT INTO entries (media_id, status, progress, score, title, title_english, title_key, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(media_id) DO UPDATE SET status = excluded.status, progress = excluded.progress, '
+            'score = excluded.score, title = excluded.title, title_english = excluded.title_english, '
+            'title_key = excluded.title_key, updated_at = excluded.updated_at',
+            (media_id, *values)
+        )
+
+    def upsert(self, entry):
+        """Insert or move one entry. entry needs status and title, media_id when known."""
+        self.upsert_many([entry])
+
+    def upsert_many(self, entries):
+        with self.lock:
+            for entry in entries:
+                self._upsert(entry)
+            self.conn.commit()
+            self.version += 1
+        self._maybe_compact()
+
+    def remove_missing(self, kept_media_ids):
+        """After a full sync: drop every row AniList no longer has. Returns the removed titles."""
+        with self.lock:
+            rows = self.conn.execute('SELECT id, media_id, title FROM entries').fetchall()
+            removed = [(row[0], row[2]) for row in rows if row[1] is None or row[1] not in kept_media_ids]
+            self.conn.executemany('DELETE FROM entries WHERE id = ?', [(row_id,) for row_id, _ in removed])
+            self.conn.commit()
+            self.version += 1
+        self._maybe_compact()
+        return [title for _, title in removed]
+
+    @property
+    def journal_path(self):
+        return self.path + '-wal'
+
+    def _maybe_compact(self):
+        try:
+            journal_size = os.path.getsize(self.journal_path)
+        except OSError:
+            return
+        if journal_size >= JOURNAL_FORCE_COMPACT_BYTES:
+            self._checkpoint()
+        elif journal_size >= JOURNAL_COMPACT_BYTES and not self.compacting.locked():
+            threading.Thread(target=self.compact_journal, daemon=True).start()
+
+    def _checkpoint(self):
+        """One TRUNCATE checkpoint on the store's own connection. True unless it came back busy."""
+        try:
+            with self.lock:
+                busy, _, _ = self.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+        except sqlite3.Error as e:
+            print(f"List journal compaction failed: {e}")
+            return True
+        return not busy
+
+    def compact_journal(self):
+        """Fold the journal into the database file and truncate it. Atomic for readers.
+
+        Runs on the store's own connection under its lock, so no write can
+        slip in halfway. A checkpoint that comes back busy is tried again.
+        """
+        if not self.compacting.acquire(blocking=False):
+            return
+        try:
+            for attempt in range(COMPACT_ATTEMPTS):
+                if self._checkpoint():
+                    return
+                time.sleep(COMPACT_RETRY_DELAY * (attempt + 1))
+            print("List journal compaction was busy, it will be tried again after the next write.")
+        finally:
+            self.compacting.release()
+
+    def resolve_media_ids(self, resolved):
+        """Give legacy rows (no media ID) their ID. resolved maps title_key -> (media_id, title)."""
+        with self.lock:
+            for title_key, (media_id, title) in resolved.items():
+                if self.conn.execute('SELECT 1 FROM entries WHERE media_id = ?', (media_id,)).fetchone():
+                    # Already stored under its ID, the legacy duplicate can go
+                    self.conn.execute('DELETE FROM entries WHERE media_id IS NULL AND title_key = ?', (title_key,))
+                else:
+                    self.conn.execute('UPDATE entries SET media_id = ?, title = ? WHERE media_id IS NULL AND title_key = ?',
+                                      (media_id, title, title_key))
+            self.conn.commit()
+            self.version += 1
+        self._maybe_compact()
+
+    def get(self, media_id):
+        with self.lock:
+            row = self.conn.execute('SELECT status, progress, score, title FROM entries WHERE media_id = ?',
+                                    (media_id,)).fetchone()
+        if row is None:
+            return None
+        return {'media_id': media_id, 'status': row[0], 'progress': row[1], 'score': row[2], 'title': row[3]}
+
+    def count(self, statuses=None):
+        return self._select('COUNT(*)', statuses)[0][0]
+
+    def statuses_by_media_id(self):
+        with self.lock:
+            return dict(self.conn.execute('SELECT media_id, status FROM entries WHERE media_id IS NOT NULL'))
+
+    def status_rows(self):
+        with self.lock:
+            return self.conn.execute('SELECT media_id, title_key, status FROM entries').fetchall()
+
+    def _select(self, columns, statuses):
+        query = f'SELECT {columns} FROM entries'
+        params = ()
+        if statuses:
+            query += f" WHERE status IN ({','.join('?' * len(statuses))})"
+            params = tuple(statuses)
+        with self.lock:
+            return self.conn.execute(query, params).fetchall()
+
+    def import_text_files(self):
+        """One-off migration from the old five text files into the store."""
+        entries = []
+        for status, file_name in EXPORT_FILES.items():
+            if status == 'REPEATING':
+                continue
+            try:
+                with open(file_name, 'r', encoding='utf-8') as file:
+                    lines = file.read().splitlines()
+            except FileNotFoundError:
+                continue
+            for line in lines:
+                title = _LEGACY_SUFFIX.sub('', line).strip()
+                if title:
+                    entries.append({'status': status, 'title': title})
+        if entries:
+            self.upsert_many(entries)
+            print(f"Imported {len(entries)} entries from the old list files.")
+
+    def export_text_files(self):
+        """Write the classic one-title-per-line files for anyone who still wants them."""
+        lines = {file_name: [] for file_name in EXPORT_FILES.values()}
+        with self.lock:
+            rows = self.conn.execute('SELECT status, title FROM entries ORDER BY title_key').fetchall()
+        for status, title in rows:
+            file_name = EXPORT_FILES.get(status)
+            if file_name:
+                lines[file_name].append(title)
+        for file_name, titles in lines.items():
+            with open(file_name, 'w', encoding='utf-8') as file:
+                for title in titles:
+                    file.write(f"{title}\n")
+        return list(lines)
+
+
+class StatusIndex:
+    """Process-wide in-memory map of media ID / normalized title to list status.
+
+    Built once from the list store and shared by every command. It is only
+    rebuilt when the store changes: either this process wrote to it, or the
+    database or journal file's mtime or size moved (another process synced).
+    Lookups in between are plain dict hits.
+    """
+
+    def __init__(self, list_store):
+        self.list_store = list_store
+        self.lock = threading.Lock()
+        self.signature = None
+        self.by_media_id = {}
+        self.by_title = {}
+        # Legacy rows that have no media ID yet
+        self.unresolved = {}
+
+    def _current_signature(self):
+        signature = [self.list_store.version]
+        for path in (self.list_store.path, self.list_store.journal_path):
+            try:
+                stat = os.stat(path)
+                signature += [stat.st_mtime_ns, stat.st_size]
+            except OSError:
+                signature += [None, None]
+        return tuple(signature)
+
+    def refresh(self):
+        signature = self._current_signature()
+        if signature == self.signature:
+            return
+        with self.lock:
+            by_media_id = {}
+            by_title = {}
+            unresolved = {}
+            for media_id, title_key, status in self.list_store.status_rows():
+                if media_id is not None:
+                    by_media_id[media_id] = status
+                else:
+                    unresolved[title_key] = status
+                by_title.setdefault(title_key, status)
+            self.by_media_id, self.by_title, self.unresolved = by_media_id, by_title, unresolved
+            self.signature = signature
+
+    def status_for(self, media_id=None, title=None):
+        self.refresh()
+        status = self.by_media_id.get(media_id) if media_id is not None else None
+        if status is None and title:
+            status = self.by_title.get(normalize_title(title))
+        return status
+
+    def status_label(self, media_id=None, title=None):
+        return STATUS_LABELS.get(self.status_for(media_id, title), 'Not Seen')
+
+    def is_listed(self, media_id=None, title=None):
+        return self.status_for(media_id, title) is not None
+
+    def media_ids(self, statuses):
+        self.refresh()
+        return {media_id for media_id, status in self.by_media_id.items() if status in statuses}
+
+    def unresolved_title_keys(self, statuses):
+        self.refresh()
+        return {title_key for title_key, status in self.unresolved.items() if status in statuses}
@@ -0,0 +1,115 @@
+import json
+import threading
+from concurrent.futures import Future
+
+BATCH_WINDOW = 0.02  # seconds to wait for more lookups before sending
+MAX_BATCH_SIZE = 20  # keeps each document well under AniList's complexity limit
+
+
+class GraphQLEnum(str):
+    """Marks an argument value that must be sent bare, e.g. GraphQLEnum('ANIME')."""
+
+
+def graphql_value(value):
+    if isinstance(value, GraphQLEnum):
+        return str(value)
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (list, tuple)):
+        return '[' + ', '.join(graphql_value(item) for item in value) + ']'
+    # JSON string escaping is valid GraphQL string escaping
+    return json.dumps(value)
+
+
+def build_field(root, arguments, selection):
+    """Build one root field, e.g. build_field('Media', {'id': 1}, 'id title { romaji }')."""
+    args = ', '.join(f"{name}: {graphql_value(value)}" for name, value in arguments.items())
+    return f"{root}({args}) {{ {selection} }}"
+
+
+class QueryBatcher:
+    """Packs many small root-field lookups into one aliased GraphQL request.
+
+    Callers submit single root fields and get a future back. Fields submitted
+    within the batch window go out together as `q0: ... q1: ...`, and the
+    response is split back so each future receives its own alias (or None if
+    AniList had nothing for it).
+    """
+
+    def __init__(self, anime_service, window=BATCH_WINDOW, max_batch=MAX_BATCH_SIZE):
+        self.anime_service = anime_service
+        self.window = window
+        self.max_batch = max_batch
+        self.lock = threading.Lock()
+        self.pending = []
+        self.timer = None
+
+        self.batches_sent = 0
+        self.fields_sent = 0
+
+    def submit(self, field):
+        future = Future()
+        batch = None
+        with self.lock:
+            self.pending.append((field, future))
+            if len(self.pending) >= self.max_batch:
+                batch = self._take_pending()
+            elif self.timer is None:
+                self.timer = threading.Timer(self.window, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+        if batch:
+            self._send(batch)
+        return future
+
+    def flush(self):
+        """Send whatever is pending right now instead of waiting for the window."""
+        with self.lock:
+            batch = self._take_pending()
+        if batch:
+            self._send(batch)
+
+    def fetch_many(self, fields):
+        """Submit several fields, send them straight away and wait for all results."""
+        futures = [self.submit(field) for field in fields]
+        self.flush()
+        return [future.result() for future in futures]
+
+    def fetch(self, field):
+        return self.fetch_many([field])[0]
+
+    def _take_pending(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending[:self.max_batch], self.pending[self.max_batch:]
+        if self.pending:
+            self.timer = threading.Timer(self.window, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+        return batch
+
+    def _send(self, batch):
+        document = "query {\n" + "\n".join(
+            f"  q{index}: {field}" for index, (field, _) in enumerate(batch)
+        ) + "\n}"
+        self.batches_sent += 1
+        self.fields_sent += len(batch)
+
+        try:
+            response = self.anime_service.post(document)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        try:
+            # A missing alias makes AniList answer 404 but the other aliases are still filled in
+            data = response.json().get('data') or {}
+        except ValueError:
+            data = {}
+
+        if not data and response.status_code != 200:
+            print(f"Batched AniList request failed: {response.status_code}")
+        for index, (_, future) in enumerate(batch):
+            future.set_result(data.get(f"q{index}"))
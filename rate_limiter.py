@@ -0,0 +1,108 @@
+import threading
+import time
+
+class RateLimiter:
+    """Token bucket that paces AniList requests.
+
+    AniList allows roughly 90 requests per minute. The bucket starts from that
+    budget and is re-synced from the X-RateLimit-* headers of every response,
+    so it follows whatever the server actually reports. Time spent waiting for
+    a token is tracked separately from network time.
+    """
+
+    def __init__(self, capacity=90, period=60.0):
+        self.lock = threading.Lock()
+        self.period = period
+        self.capacity = capacity
+        self.refill_rate = capacity / period
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+        self.blocked_until = 0.0
+
+        # Throttle accounting
+        self.throttled_requests = 0
+        self.throttled_seconds = 0.0
+        self.rate_limited_responses = 0
+
+    def _refill(self, now):
+        elapsed = now - self.last_refill
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+            self.last_refill = now
+
+    def acquire(self):
+        """Block until a request may be sent. Returns the seconds spent waiting."""
+        start = time.monotonic()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    waited = now - start
+                    if waited > 0.001:
+                        self.throttled_requests += 1
+                        self.throttled_seconds += waited
+                    return waited
+                else:
+                    wait = (1 - self.tokens) / self.refill_rate
+            time.sleep(wait)
+
+    def try_acquire(self):
+        """Take a token only if one is free right now (used for optional extra requests)."""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now >= self.blocked_until and self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def update_from_headers(self, headers):
+        """Sync the bucket with the limit the server just reported."""
+        limit = self.int_header(headers, 'X-RateLimit-Limit')
+        remaining = self.int_header(headers, 'X-RateLimit-Remaining')
+        reset = self.int_header(headers, 'X-RateLimit-Reset')
+
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            if limit and limit != self.capacity:
+                self.capacity = limit
+                self.refill_rate = limit / self.period
+            if remaining is not None:
+                # The server's count wins both ways, after a 429 it is also what lets us burst again
+                self.tokens = min(float(self.capacity), float(remaining))
+                if remaining <= 0 and reset:
+                    # Reset is a unix timestamp; translate it onto the monotonic clock
+                    self.blocked_until = max(self.blocked_until, now + max(reset - time.time(), 0))
+
+    def retry_after(self, seconds):
+        """Stop sending for exactly as long as the server asked after a 429."""
+        with self.lock:
+            self.rate_limited_responses += 1
+            self.tokens = 0.0
+            self.last_refill = time.monotonic()
+            self.blocked_until = max(self.blocked_until, self.last_refill + seconds)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'throttled_requests': self.throttled_requests,
+                'throttled_seconds': round(self.throttled_seconds, 3),
+                'rate_limited_responses': self.rate_limited_responses,
+                'tokens': round(self.tokens, 2),
+                'capacity': self.capacity,
+            }
+
+    @staticmethod
+    def int_header(headers, name):
+        value = headers.get(name)
+        if value is None:
+            return None
+        try:
+            return int(float(value))
+        except ValueError:
+            return None
@@ -0,0 +1,198 @@
+import sqlite3
+import threading
+import time
+from anilist_dates import fuzzy_date
+
+GRAPH_FILE = 'relation_graph.db'
+
+# Nodes older than this are fetched again, ongoing shows pick up new sequels that way
+NODE_TTL = 7 * 24 * 3600
+
+# Edges that keep us inside one franchise when planning a watch order
+FRANCHISE_RELATIONS = ('SEQUEL', 'PREQUEL', 'SIDE_STORY', 'PARENT')
+
+# Hard stop for franchises that sprawl through side stories
+MAX_FRANCHISE_NODES = 300
+
+# Selection to request whenever media should be recorded in the graph
+RELATION_MEDIA_SELECTION = """
+    id
+    title {
+      romaji
+    }
+    format
+    episodes
+    duration
+    startDate {
+      year
+      month
+      day
+    }
+    relations {
+      edges {
+        node {
+          id
+          type
+          title {
+            romaji
+          }
+        }
+        relationType
+      }
+    }
+"""
+
+
+class RelationGraph:
+    """Local store of media nodes and their typed relation edges.
+
+    Any command that downloads `relations` can hand the media to record_media,
+    so the graph grows as a side effect of normal use. Nodes that are only
+    known as the target of an edge have no fetched_at yet and form the
+    frontier that still has to be downloaded.
+    """
+
+    def __init__(self, path=GRAPH_FILE):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS nodes (
+                    id INTEGER PRIMARY KEY,
+                    title TEXT,
+                    title_lower TEXT,
+                    format TEXT,
+                    episodes INTEGER,
+                    duration INTEGER,
+                    start_date INTEGER,
+                    fetched_at REAL
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS edges (
+                    src INTEGER NOT NULL,
+                    dst INTEGER NOT NULL,
+                    relation TEXT NOT NULL,
+                    PRIMARY KEY (src, dst, relation)
+                )
+            """)
+            self.conn.execute('CREATE INDEX IF NOT EXISTS nodes_title ON nodes (title_lower)')
+            self.conn.commit()
+
+    def record_media(self, media_items):
+        """Store fully fetched media and every ANIME edge hanging off them."""
+        now = time.time()
+        with self.lock:
+            for media in media_items:
+                if not media or 'relations' not in media:
+                    continue
+                title = (media.get('title') or {}).get('romaji')
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO nodes (id, title, title_lower, format, episodes, duration, start_date, fetched_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (media['id'], title, title.lower() if title else None, media.get('format'),
+                     media.get('episodes'), media.get('duration'), fuzzy_date(media.get('startDate')), now)
+                )
+                self.conn.execute('DELETE FROM edges WHERE src = ?', (media['id'],))
+                for edge in (media.get('relations') or {}).get('edges', []):
+                    node = edge['node']
+                    if node.get('type') != 'ANIME':
+                        continue
+                    self.conn.execute('INSERT OR IGNORE INTO edges (src, dst, relation) VALUES (?, ?, ?)',
+                                      (media['id'], node['id'], edge['relationType']))
+                    node_title = (node.get('title') or {}).get('romaji')
+                    self.conn.execute('INSERT OR IGNORE INTO nodes (id, title, title_lower) VALUES (?, ?, ?)',
+                                      (node['id'], node_title, node_title.lower() if node_title else None))
+            self.conn.commit()
+
+    def find_by_title(self, title):
+        with self.lock:
+            row = self.conn.execute('SELECT id FROM nodes WHERE title_lower = ? AND fetched_at IS NOT NULL',
+                                    (title.strip().lower(),)).fetchone()
+        return row[0] if row else None
+
+    def _fresh_ids(self, media_ids):
+        cutoff = time.time() - NODE_TTL
+        with self.lock:
+            placeholders = ','.join('?' * len(media_ids))
+            rows = self.conn.execute(f'SELECT id FROM nodes WHERE id IN ({placeholders}) AND fetched_at >= ?',
+                                     (*media_ids, cutoff)).fetchall()
+        return {row[0] for row in rows}
+
+    def stored_media(self, media_ids):
+        """Fresh nodes shaped like the media RELATION_MEDIA_SELECTION returns, missing ones left out."""
+        media_ids = list(media_ids)
+        if not media_ids:
+            return []
+        fresh = self._fresh_ids(media_ids)
+        if not fresh:
+            return []
+        placeholders = ','.join('?' * len(fresh))
+        with self.lock:
+            nodes = self.conn.execute(
+                f'SELECT id, title, format, episodes, duration, start_date FROM nodes WHERE id IN ({placeholders})',
+                tuple(fresh)
+            ).fetchall()
+            edges = self.conn.execute(
+                f'SELECT edges.src, edges.dst, edges.relation, nodes.title FROM edges '
+                f'LEFT JOIN nodes ON nodes.id = edges.dst WHERE edges.src IN ({placeholders})',
+                tuple(fresh)
+            ).fetchall()
+        media = {}
+        for media_id, title, media_format, episodes, duration, start_date in nodes:
+            media[media_id] = {
+                'id': media_id, 'title': {'romaji': title}, 'format': media_format,
+                'episodes': episodes, 'duration': duration,
+                'startDate': {'year': start_date // 10000 or None, 'month': start_date // 100 % 100 or None,
+                              'day': start_date % 100 or None} if start_date else {},
+                'relations': {'edges': []},
+            }
+        for src, dst, relation, title in edges:
+            # Only ANIME edges are ever stored
+            media[src]['relations']['edges'].append(
+                {'node': {'id': dst, 'type': 'ANIME', 'title': {'romaji': title}}, 'relationType': relation}
+            )
+        return [media[media_id] for media_id in media_ids if media_id in media]
+
+    def _neighbours(self, media_ids, relations):
+        with self.lock:
+            id_marks = ','.join('?' * len(media_ids))
+            relation_marks = ','.join('?' * len(relations))
+            rows = self.conn.execute(
+                f'SELECT dst FROM edges WHERE src IN ({id_marks}) AND relation IN ({relation_marks})',
+                (*media_ids, *relations)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def franchise(self, root_id, fetch_missing, relations=FRANCHISE_RELATIONS):
+        """Return every node of the franchise around root_id, ordered by start date.
+
+        fetch_missing(ids) is called once per BFS level with only the nodes
+        that are not stored yet (or are stale) and must return their media,
+        which is recorded before the walk continues.
+        """
+        visited = {root_id}
+        level = [root_id]
+        while level and len(visited) <= MAX_FRANCHISE_NODES:
+            fresh = self._fresh_ids(level)
+            missing = [media_id for media_id in level if media_id not in fresh]
+            if missing:
+                self.record_media(fetch_missing(missing))
+            next_level = self._neighbours(level, relations) - visited
+            visited |= next_level
+            level = list(next_level)
+
+        with self.lock:
+            placeholders = ','.join('?' * len(visited))
+            rows = self.conn.execute(
+                f'SELECT id, title, format, episodes, duration, start_date FROM nodes '
+                f'WHERE id IN ({placeholders}) AND fetched_at IS NOT NULL',
+                tuple(visited)
+            ).fetchall()
+        nodes = [
+            {'id': row[0], 'title': row[1], 'format': row[2], 'episodes': row[3],
+             'duration': row[4], 'start_date': row[5]}
+            for row in rows
+        ]
+        # Unknown start dates (not yet announced) go last
+        return sorted(nodes, key=lambda node: (node['start_date'] or 99999999, node['id']))
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+CACHE_FILE = 'anilist_cache.db'
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+# How long each kind of response stays fresh, in seconds
+CACHE_TTLS = {
+    'media': 7 * 24 * 3600,  # titles, episodes, relations barely change
+    'airing': 15 * 60,       # next episode countdowns, recently finished shows
+    'finished': 24 * 3600,   # shows that finished in a week that is already over
+    'user': 10 * 60,         # profile statistics
+    'profile': 24 * 3600,    # genre/tag taste statistics used by recommend
+    'list': 5 * 60,          # anybody's anime list
+}
+
+# First matching rule wins, anything else is plain media metadata
+CACHE_KIND_RULES = [
+    ('list', ('MediaListCollection', 'mediaList')),
+    ('user', ('User(',)),
+    ('airing', ('nextAiringEpisode', 'airingSchedule', 'END_DATE_DESC', 'RELEASING')),
+]
+
+# Which cached kinds a mutation can make stale
+MUTATION_INVALIDATES = ('list', 'user')
+
+
+class CachedResponse:
+    """Stands in for a requests.Response when an answer comes from the cache."""
+    status_code = 200
+    ok = True
+    from_cache = True
+
+    def __init__(self, content):
+        self.content = content
+        self.headers = {}
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        pass
+
+
+class ResponseCache:
+    """On-disk cache of AniList read responses.
+
+    Entries are keyed by the whitespace-normalized query text plus its
+    variables, stored zlib-compressed, expire per kind of data (CACHE_TTLS)
+    and are evicted least-recently-used once the file passes max_bytes.
+    """
+
+    def __init__(self, path=CACHE_FILE, max_bytes=MAX_CACHE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock:
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self.conn.execute('CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS responses_kind ON responses (kind)')
+            self.conn.commit()
+
+    @staticmethod
+    def normalize_query(query):
+        return ' '.join(query.split())
+
+    @classmethod
+    def make_key(cls, query, variables):
+        normalized = cls.normalize_query(query)
+        variables_text = json.dumps(variables or {}, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(f"{normalized}\n{variables_text}".encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def classify(query):
+        for kind, markers in CACHE_KIND_RULES:
+            if any(marker in query for marker in markers):
+                return kind
+        return 'media'
+
+    def get(self, query, variables=None):
+        """Return the cached body for a query, or None if missing or expired."""
+        key = self.make_key(query, variables)
+        now = time.time()
+        try:
+            with self.lock:
+                row = self.conn.execute('SELECT payload, expires FROM responses WHERE key = ?', (key,)).fetchone()
+                if row is None or row[1] < now:
+                    if row is not None:
+                        self.conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                        self.conn.commit()
+                    self.misses += 1
+                    return None
+                self.conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (now, key))
+                self.conn.commit()
+                self.hits += 1
+            return zlib.decompress(row[0])
+        except (sqlite3.Error, zlib.error):
+            return None
+
+    def put(self, query, variables, content, kind=None):
+        kind = kind or self.classify(query)
+        payload = zlib.compress(content, 6)
+        now = time.time()
+        try:
+            with self.lock:
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO responses (key, kind, payload, size, expires, last_access) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (self.make_key(query, variables), kind, payload, len(payload), now + CACHE_TTLS[kind], now)
+                )
+                self._evict()
+                self.conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def _evict(self):
+        total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until we are back under 90% of the cap
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        stale = []
+        for key, size in self.conn.execute('SELECT key, size FROM responses ORDER BY last_access'):
+            stale.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        self.conn.executemany('DELETE FROM responses WHERE key = ?', stale)
+
+    def invalidate(self, kinds=MUTATION_INVALIDATES):
+        try:
+            with self.lock:
+                self.conn.executemany('DELETE FROM responses WHERE kind = ?', [(kind,) for kind in kinds])
+                self.conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def clear(self):
+        self.invalidate(tuple(CACHE_TTLS))
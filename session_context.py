@@ -0,0 +1,119 @@
+import threading
+
+class SessionContext:
+    """Everything a command needs that outlives the command itself.
+
+    The REPL creates one per run and the factory hands it to every command.
+    username.txt and token.txt are read once. The AniList client (with its
+    response cache) and the local stores and indexes are built here the
+    first time a command asks for them and held for the rest of the run.
+    """
+
+    def __init__(self, api_url, username=None):
+        self.api_url = api_url
+        self._username = username
+        self._token = None
+        self._token_loaded = False
+        self._anime_service = None
+        self._stores = {}
+        # Reentrant, a store may be built from another one (the status index from the list store)
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def get_username_from_file():
+        try:
+            with open('username.txt', 'r') as file:
+                return file.read().strip()
+        except FileNotFoundError:
+            print("Username file not found.")
+            return None
+
+    @property
+    def username(self):
+        if self._username is None:
+            self._username = self.get_username_from_file() or ''
+        return self._username
+
+    @username.setter
+    def username(self, username):
+        self._username = username
+
+    @staticmethod
+    def get_token_from_file():
+        try:
+            with open('token.txt', 'r') as file:
+                return file.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    @property
+    def token(self):
+        if not self._token_loaded:
+            self._token = self.get_token_from_file()
+            self._token_loaded = True
+        return self._token
+
+    @property
+    def headers(self):
+        from anime_service import AnimeService
+        return AnimeService.build_headers(self.token)
+
+    def set_token(self, token):
+        """Use a new token from now on (after 'token' saved one), without a restart."""
+        self._token = token
+        self._token_loaded = True
+        if self._anime_service is not None:
+            self._anime_service.set_headers(self.headers)
+
+    @property
+    def anime_service(self):
+        with self.lock:
+            if self._anime_service is None:
+                from anime_service import AnimeService
+                self._anime_service = AnimeService(self.api_url, headers=self.headers,
+                                                   cache=AnimeService.open_cache())
+            return self._anime_service
+
+    def request_stats(self):
+        """AniList client counters, None when no command talked to AniList this session."""
+        if self._anime_service is None:
+            return None
+        return self._anime_service.get_stats()
+
+    def _store(self, name, build):
+        with self.lock:
+            if name not in self._stores:
+                self._stores[name] = build()
+            return self._stores[name]
+
+    # The stores below are imported on first use, numpy and sqlite stay out of startup
+
+    @property
+    def list_store(self):
+        from list_store import ListStore
+        return self._store('list_store', ListStore)
+
+    @property
+    def status_index(self):
+        from list_store import StatusIndex
+        return self._store('status_index', lambda: StatusIndex(self.list_store))
+
+    @property
+    def friend_lists(self):
+        from friend_lists import FriendLists
+        return self._store('friend_lists', FriendLists)
+
+    @property
+    def relation_graph(self):
+        from relation_graph import RelationGraph
+        return self._store('relation_graph', RelationGraph)
+
+    @property
+    def catalog_mirror(self):
+        from catalog_mirror import CatalogMirror
+        return self._store('catalog_mirror', CatalogMirror)
+
+    @property
+    def title_index(self):
+        from title_index import TitleIndex
+        return self._store('title_index', lambda: TitleIndex(self.catalog_mirror))
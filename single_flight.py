@@ -0,0 +1,40 @@
+import threading
+from concurrent.futures import Future
+
+class SingleFlight:
+    """Collapse identical concurrent calls into one.
+
+    The first caller for a key does the work; anyone asking for the same key
+    while it is still running waits on the first caller's future and gets the
+    same result (or exception).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self.lock:
+            future = self.in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.in_flight[key] = future
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self.in_flight[key]
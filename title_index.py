@@ -0,0 +1,127 @@
+import os
+import threading
+import numpy as np
+from rapidfuzz import fuzz
+from catalog_mirror import STRING_COLUMNS
+from list_store import normalize_title
+
+# Rows with the most shared trigrams that get a full fuzzy score
+CANDIDATE_ROWS = 20
+
+INDEX_COLUMNS = ['trigram_codes', 'posting_offsets', 'postings', 'row_trigram_counts']
+
+
+def trigrams(title):
+    """Trigram codes of a normalized title, padded like pg_trgm so short words still match."""
+    padded = f"  {title} "
+    return {(ord(padded[i]) << 42) | (ord(padded[i + 1]) << 21) | ord(padded[i + 2])
+            for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    """Trigram inverted index over every title of the catalog mirror.
+
+    Stored next to the mirror as memory-mapped arrays: the sorted trigram
+    codes, offsets into the postings, the postings themselves (mirror rows)
+    and how many distinct trigrams each row has. A lookup is a binary search
+    per query trigram and one bincount. Rows are ranked by trigram Jaccard
+    similarity, so long titles that merely contain the query do not crowd
+    out the exact one, and only the best few are fuzzy scored.
+    """
+
+    def __init__(self, catalog_mirror):
+        self.catalog_mirror = catalog_mirror
+        self.lock = threading.Lock()
+        self.generation = None
+        self.columns = None
+
+    def _file(self, name, generation):
+        return os.path.join(self.catalog_mirror.path, f"{name}.{generation}.npy")
+
+    def titles_of(self, row):
+        names = []
+        for column in STRING_COLUMNS:
+            value = self.catalog_mirror.string(int(self.catalog_mirror.columns[column][row]))
+            if value:
+                names.extend(value.split('\n'))
+        return names
+
+    def build(self):
+        """Build the index for the current mirror generation and save it beside the columns."""
+        if not self.catalog_mirror.available:
+            return False
+        generation = self.catalog_mirror.meta['generation']
+        codes = []
+        rows = []
+        for row in range(self.catalog_mirror.meta['count']):
+            row_codes = set()
+            for name in self.titles_of(row):
+                row_codes |= trigrams(normalize_title(name))
+            codes.extend(row_codes)
+            rows.extend([row] * len(row_codes))
+
+        codes = np.array(codes, dtype=np.int64)
+        rows = np.array(rows, dtype=np.int32)
+        order = np.lexsort((rows, codes))
+        codes, rows = codes[order], rows[order]
+        unique_codes, starts = np.unique(codes, return_index=True)
+        arrays = {
+            'trigram_codes': unique_codes,
+            'posting_offsets': np.append(starts, len(codes)).astype(np.int64),
+            'postings': rows,
+            'row_trigram_counts': np.bincount(rows, minlength=self.catalog_mirror.meta['count']).astype(np.int32),
+        }
+        for name, array in arrays.items():
+            np.save(self._file(name, generation), array)
+        return True
+
+    def load(self):
+        if not self.catalog_mirror.available:
+            return False
+        generation = self.catalog_mirror.meta['generation']
+        with self.lock:
+            if self.generation == generation:
+                return True
+            if not all(os.path.exists(self._file(name, generation)) for name in INDEX_COLUMNS):
+                # Mirrors written before the index existed get it on first use
+                self.build()
+            try:
+                self.columns = {name: np.load(self._file(name, generation), mmap_mode='r') for name in INDEX_COLUMNS}
+            except (OSError, ValueError):
+                return False
+            self.generation = generation
+            return True
+
+    def search(self, title, limit=5):
+        """Best matching mirror rows as (row, score), score 0-100, highest first."""
+        query = normalize_title(title)
+        if not query or not self.load():
+            return []
+        codes = self.columns['trigram_codes']
+        offsets = self.columns['posting_offsets']
+        postings = self.columns['postings']
+
+        query_codes = np.fromiter(trigrams(query), dtype=np.int64)
+        positions = np.searchsorted(codes, query_codes)
+        found = positions < len(codes)
+        found[found] = codes[positions[found]] == query_codes[found]
+        positions = positions[found]
+        if positions.size == 0:
+            return []
+
+        hits = np.bincount(np.concatenate([postings[offsets[idx]:offsets[idx + 1]] for idx in positions]),
+                           minlength=self.catalog_mirror.meta['count'])
+        matched = np.flatnonzero(hits)
+        shared = hits[matched]
+        jaccard = shared / (len(query_codes) + self.columns['row_trigram_counts'][matched] - shared)
+        count = min(CANDIDATE_ROWS, len(matched))
+        candidates = matched[np.argpartition(-jaccard, count - 1)[:count]]
+
+        popularity = self.catalog_mirror.columns['popularity']
+        scored = []
+        for row in candidates:
+            score = max(fuzz.token_sort_ratio(query, normalize_title(name)) for name in self.titles_of(int(row)))
+            scored.append((score, int(popularity[row]), int(row)))
+        # Equal scores (e.g. a season and its recap) go to the better known show
+        scored.sort(reverse=True)
+        return [(row, score) for score, _, row in scored[:limit]]
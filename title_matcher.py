@@ -0,0 +1,56 @@
+import time
+import numpy as np
+from rapidfuzz import fuzz, process
+from list_store import normalize_title
+
+DEFAULT_SCORER = 'ratio'
+
+# A match must score strictly above this (0-100)
+DEFAULT_THRESHOLD = 80
+
+# Queries are scored in blocks of this many rows to keep the matrix small
+MATCH_BLOCK_ROWS = 2048
+
+SCORERS = {
+    'ratio': fuzz.ratio,
+    'partial_ratio': fuzz.partial_ratio,
+    'token_sort_ratio': fuzz.token_sort_ratio,
+    'token_set_ratio': fuzz.token_set_ratio,
+    'wratio': fuzz.WRatio,
+    'qratio': fuzz.QRatio,
+}
+
+
+class TitleMatcher:
+    """Fuzzy title matching against a fixed set of normalized titles.
+
+    All queries are scored at once with rapidfuzz.process.cdist on every core,
+    then each row's best candidate is picked with one argmax over the matrix.
+    """
+
+    def __init__(self, choices, scorer=DEFAULT_SCORER, threshold=DEFAULT_THRESHOLD):
+        if scorer not in SCORERS:
+            raise ValueError(f"Unknown scorer '{scorer}', pick one of: {', '.join(SCORERS)}")
+        self.choices = list(choices)
+        self.scorer_name = scorer
+        self.scorer = SCORERS[scorer]
+        self.threshold = threshold
+        self.last_duration = 0.0
+
+    def best_matches(self, titles):
+        """Return (choice, score) per title, choice is None when nothing scores above the threshold."""
+        start = time.perf_counter()
+        queries = [normalize_title(title) for title in titles]
+        results = [(None, 0.0)] * len(queries)
+        if queries and self.choices:
+            for offset in range(0, len(queries), MATCH_BLOCK_ROWS):
+                block = queries[offset:offset + MATCH_BLOCK_ROWS]
+                scores = process.cdist(block, self.choices, scorer=self.scorer, dtype=np.float32,
+                                       workers=-1, score_cutoff=self.threshold)
+                best = scores.argmax(axis=1)
+                best_scores = scores[np.arange(len(block)), best]
+                for row, (column, score) in enumerate(zip(best, best_scores)):
+                    if score > self.threshold:
+                        results[offset + row] = (self.choices[column], float(score))
+        self.last_duration = time.perf_counter() - start
+        return results
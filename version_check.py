@@ -0,0 +1,100 @@
+import json
+import threading
+import time
+import requests
+from colorama import Fore
+from http_policy import get_with_retries
+
+REMOTE_VERSION_URL = "https://raw.githubusercontent.com/sed-/Loader-senpai/main/Version.txt"
+VERSION_CACHE_FILE = 'version_check.json'
+
+# GitHub is asked at most once a day, every other start uses the cached answer
+VERSION_CHECK_TTL = 24 * 3600
+
+_notices = []
+_notices_lock = threading.Lock()
+
+
+# Function to fetch remote version
+def fetch_remote_version():
+    try:
+        response = get_with_retries(REMOTE_VERSION_URL)
+        response.raise_for_status()  # Raise an error for bad response
+        for line in response.text.splitlines():
+            if line.startswith("Version:"):
+                return line.split(":")[1].strip()
+    except requests.RequestException as e:
+        _notify(f"Error fetching remote version: {e}")
+    return None
+
+
+# Function to fetch local version
+def fetch_local_version():
+    try:
+        with open("Version.txt", "r") as file:
+            for line in file.readlines():
+                if line.startswith("Version:"):
+                    return line.split(":")[1].strip()
+    except FileNotFoundError:
+        _notify(f"{Fore.RED}Local Version.txt file not found!")
+    return None
+
+
+def load_cached_remote_version():
+    try:
+        with open(VERSION_CACHE_FILE, 'r', encoding='utf-8') as file:
+            cached = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if time.time() - cached.get('checked_at', 0) > VERSION_CHECK_TTL:
+        return None
+    return cached.get('remote_version')
+
+
+def save_cached_remote_version(remote_version):
+    try:
+        with open(VERSION_CACHE_FILE, 'w', encoding='utf-8') as file:
+            json.dump({'checked_at': time.time(), 'remote_version': remote_version}, file)
+    except OSError:
+        pass
+
+
+def _notify(message):
+    with _notices_lock:
+        _notices.append(message)
+
+
+def pending_notices():
+    """Notices the background check produced since the last call."""
+    with _notices_lock:
+        notices = list(_notices)
+        _notices.clear()
+    return notices
+
+
+# Function to check versions and prompt the user to update if needed
+def check_version():
+    remote_version = load_cached_remote_version()
+    if remote_version is None:
+        remote_version = fetch_remote_version()
+        if remote_version:
+            save_cached_remote_version(remote_version)
+    local_version = fetch_local_version()
+
+    if remote_version and local_version:
+        if remote_version != local_version:
+            _notify(f"{Fore.LIGHTCYAN_EX}Current version is {remote_version} and you are currently running {local_version}.")
+            _notify(f"{Fore.LIGHTCYAN_EX}Please run the updater to get the latest update.")
+        else:
+            _notify(f"{Fore.GREEN}Version: {local_version}")
+    elif not local_version:
+        _notify(f"{Fore.RED}Local version could not be found or read.")
+    elif not remote_version:
+        _notify(f"{Fore.RED}Could not fetch the remote version.")
+
+
+def start_version_check():
+    """Run check_version on a daemon thread, the prompt never waits for GitHub."""
+    thread = threading.Thread(target=check_version, daemon=True)
+    thread.start()
+    return thread